@@ -5,7 +5,14 @@ import random
 
 from datetime import datetime
 from dataclasses import dataclass, field
-from redis_om import HashModel, NotFoundError, Field
+from redis_om import HashModel, Field
+from redis_om.model.model import (
+    convert_base64_to_bytes,
+    convert_bytes_to_vector,
+    convert_empty_strings_to_none,
+    convert_timestamp_to_datetime,
+    decode_redis_value,
+)
 from pydantic import ValidationError
 
 from disinfo.data_structures import FrameState
@@ -23,7 +30,8 @@ from disinfo.utils import ease
 from disinfo.utils.func import throttle
 from disinfo.utils.imops import image_from_url
 from disinfo.utils.cairo import load_svg_string, render_emoji, load_svg
-from disinfo.drat.app_states import RuntimeStateManager
+from disinfo.drat.app_states import RuntimeStateManager, PubSubManager, PubSubMessage
+from disinfo.redis import publish
 
 from .news_highlights import extract_highlights
 
@@ -71,32 +79,108 @@ class NewsStory(HashModel, index=True):
         return stuff
 
     @classmethod
-    def iter_items(cls, limit: int = 0):
-        for i, pk in enumerate(cls.all_pks()):
-            if limit and limit <= i:
-                break
-            try:
-                yield cls.get(pk)
-            except NotFoundError:
+    def from_document(cls, pk: str, document: dict) -> 'NewsStory':
+        '''Parses a story from its raw HGETALL reply, the same way `get` does.'''
+        if any(isinstance(k, bytes) for k in document):
+            document = decode_redis_value(document, cls.Meta.encoding)
+        for convert in (
+            convert_empty_strings_to_none,
+            convert_timestamp_to_datetime,
+            convert_base64_to_bytes,
+            convert_bytes_to_vector,
+        ):
+            document = convert(document, cls.model_fields)
+        return cls.model_validate({**document, cls._meta.primary_key.name: pk})
+
+    @classmethod
+    def load_all(cls) -> list['NewsStory']:
+        '''All the stories, read with a single pipelined round trip.'''
+        pks = list(cls.all_pks())
+        pipe = cls.db().pipeline(transaction=False)
+        for pk in pks:
+            pipe.hgetall(cls.make_primary_key(pk))
+
+        stories = []
+        for pk, document in zip(pks, pipe.execute()):
+            if not document:
+                # Expired since the scan.
                 continue
+            try:
+                stories.append(cls.from_document(pk, document))
             except ValidationError:
                 continue
-    
-    @classmethod
-    def get_by_index(cls, ix: int):
-        return [i for i in cls.iter_items() if i.index == ix][0]
+        return stories
 
-    @staticmethod
-    def shuffled_indices():
+    @classmethod
+    def iter_items(cls, limit: int = 0):
+        stories = cls.load_all()
+        yield from stories[:limit] if limit else stories
+
+
+class NewsStore:
+    '''
+    In-process index of the stories by `index` and `category`.
+
+    Stories are loaded in one batch, and reloaded only after an update is
+    published on `di.pubsub.news`, so the deck does not touch redis on
+    every frame.
+    '''
+    def __init__(self):
+        self.version = 0
+        self.loaded_version = None
+        self.by_index: dict[int, NewsStory] = {}
+        self.by_category: dict[str, list[NewsStory]] = {}
+
+    def _on_message(self, channel: str, data: PubSubMessage):
+        if data.action == 'update':
+            self.version += 1
+
+    def _ensure(self):
+        if self.loaded_version is None:
+            PubSubManager().attach('news.store', ('di.pubsub.news',), self._on_message)
+        if self.loaded_version == self.version:
+            return
+        version = self.version
+        stories = NewsStory.load_all()
+        self.by_index = {st.index: st for st in stories}
+        self.by_category = {}
+        for st in sorted(stories, key=lambda st: st.index):
+            self.by_category.setdefault(st.category, []).append(st)
+        self.loaded_version = version
+
+    def stories(self) -> list[NewsStory]:
+        self._ensure()
+        return list(self.by_index.values())
+
+    def category(self, name: str) -> list[NewsStory]:
+        self._ensure()
+        return self.by_category.get(name, [])
+
+    def get_by_index(self, ix: int) -> NewsStory:
+        self._ensure()
+        try:
+            return self.by_index[ix]
+        except KeyError:
+            raise IndexError(ix)
+
+    def shuffled_indices(self) -> list[int]:
         sysrandom = random.SystemRandom()
         sysrandom.seed(time.time())
-        items = [i.index for i in NewsStory.iter_items()]
+        items = [st.index for st in self.stories()]
         sysrandom.shuffle(items)
         return items
 
-    @classmethod
-    def count(cls) -> int:
-        return len(list(cls.all_pks()))
+    def count(self) -> int:
+        self._ensure()
+        return len(self.by_index)
+
+    def discard(self, story: NewsStory):
+        '''Drops the story from the index, once it is expired in redis.'''
+        if self.by_index.get(story.index) is story:
+            del self.by_index[story.index]
+            self.by_category[story.category].remove(story)
+
+news_store = NewsStore()
 
 
 KAGI_ENDPOINT = 'https://news.kagi.com/api/batches/latest'
@@ -121,11 +205,12 @@ def kagi_get_category_ids(categories: list[str]) -> dict[str, str]:
 
 @throttle(15000)
 def kagi_load_stories(fs: FrameState) -> bool:
-    if any(x for x in NewsStory.iter_items()):
+    if news_store.stories():
         print("[*] Skipping News Update")
         return False
 
     ix = 0
+    pipe = NewsStory.db().pipeline(transaction=False)
     for cat, cid in kagi_get_category_ids(CATEGORIES).items():
         data = requests.get(f'{KAGI_ENDPOINT}/categories/{cid}/stories', timeout=10).json()
         stories = data['stories']
@@ -142,8 +227,10 @@ def kagi_load_stories(fs: FrameState) -> bool:
                 primary_image_url=story.get('primary_image', {}).get('url', ''),
                 primary_image_caption=story.get('primary_image', {}).get('caption', ''),
                 raw=json.dumps(story),
-            ).save()
+            ).save(pipeline=pipe)
             ix += 1
+    pipe.execute()
+    publish('di.pubsub.news', action='update')
     act('buzzer', 'ok', 'news')
     return True
 
@@ -176,17 +263,18 @@ def _news_deck(fs: FrameState):
         print("Can't load news", str(e))
         return
     if not state.shuffled:
-        state.shuffled = NewsStory.shuffled_indices()
+        state.shuffled = news_store.shuffled_indices()
         state.story_index = 0
 
     if (state.changed_at + state.change_in) < fs.tick:
-        state.count = NewsStory.count()
+        state.count = news_store.count()
         state.story_index += 1
         state.changed_at = fs.tick
         if state.story:
-            state.story.expire(1)    
+            state.story.expire(1)
+            news_store.discard(state.story)
     try:
-        st: NewsStory = NewsStory.get_by_index(state.shuffled[state.story_index])
+        st: NewsStory = news_store.get_by_index(state.shuffled[state.story_index])
     except IndexError:
         state.shuffled = None
         return
@@ -5,7 +5,7 @@ import bisect
 from datetime import datetime
 from dataclasses import dataclass
 from collections import namedtuple
-from redis_om import HashModel
+from redis_om import HashModel, NotFoundError
 
 from disinfo.data_structures import AppBaseModel, FrameState
 from disinfo.components.widget import Widget
@@ -16,6 +16,8 @@ from disinfo.components.transitions import Resize, text_slide_in
 from disinfo.components import fonts
 from disinfo.components.elements import Frame
 from disinfo.web.telemetry import TelemetryStateManager, act
+from disinfo.drat.app_states import PubSubManager, PubSubMessage
+from disinfo.redis import publish
 
 
 class TimerEntry(HashModel, index=True):
@@ -30,6 +32,66 @@ class TimerEntry(HashModel, index=True):
     def end(self):
         return pendulum.instance(self.target, tz='local')
 
+    @property
+    def expires_at(self):
+        # The entry expires 1.5 times its duration after it is created.
+        return self.end.add(seconds=int(self.duration * 1.5) - self.duration)
+
+
+class TimerStore:
+    '''
+    Active timers, sorted by their end.
+
+    Timers are loaded from redis only after an update is published on
+    `di.pubsub.timers`, and dropped from memory when they expire; so the
+    frame path does not touch redis until one of them triggers.
+    '''
+    def __init__(self):
+        self.version = 0
+        self.loaded_version = None
+        self.timers: list[TimerEntry] = []
+        # Next time a timer expires.
+        self.wakeup = None
+
+    def _on_message(self, channel: str, data: PubSubMessage):
+        if data.action == 'update':
+            self.version += 1
+
+    def _load(self) -> list[TimerEntry]:
+        timers = []
+        for pk in TimerEntry.all_pks():
+            try:
+                timers.append(TimerEntry.get(pk))
+            except NotFoundError:
+                # Expired since the scan.
+                continue
+        return timers
+
+    def _set(self, timers: list[TimerEntry]):
+        self.timers = sorted(timers, key=lambda t: t.end)
+        self.wakeup = min((t.expires_at for t in timers), default=None)
+
+    def active(self, now: pendulum.DateTime) -> list[TimerEntry]:
+        if self.loaded_version is None:
+            PubSubManager().attach('timer.store', ('di.pubsub.timers',), self._on_message)
+        if self.loaded_version != self.version:
+            version = self.version
+            self._set(self._load())
+            self.loaded_version = version
+        elif self.wakeup and now >= self.wakeup:
+            self._set([t for t in self.timers if t.expires_at > now])
+        return self.timers
+
+    def add(self, entry: TimerEntry, ttl: int) -> TimerEntry:
+        entry.save()
+        entry.expire(ttl)
+        self._set([*self.timers, entry])
+        publish('di.pubsub.timers', action='update')
+        return entry
+
+timer_store = TimerStore()
+
+
 @dataclass
 class State:
     mode: str = 'init'
@@ -88,8 +150,9 @@ def timer_view(fs: FrameState):
         act('buzzer', 'encoder' if state.direction else 'encoder-', 'beep')
 
     if remote('select') and state.mode == 'create' and (fs.tick - state.last_timer_at) > 2:
-        entry = TimerEntry(target=fs.now.add(seconds=state.duration), duration=state.duration).save()
-        entry.expire(int(state.duration * 1.5))
+        entry = timer_store.add(
+            TimerEntry(target=fs.now.add(seconds=state.duration), duration=state.duration),
+            ttl=int(state.duration * 1.5))
         state.active_pk = entry.pk
         state.mode = 'idle'
         state.duration = 0
@@ -142,8 +205,7 @@ def timer_view(fs: FrameState):
         rows.append(display(max(state.duration, 0)))
 
 
-    timers = [TimerEntry.get(tid) for tid in TimerEntry.all_pks()]
-    timers.sort(key=lambda t: t.end)
+    timers = timer_store.active(fs.now)
     for timer in timers:
         rows.append(timecard(timer))
         trigger = 7 if timer.duration > 10 else 1
@@ -5,6 +5,7 @@ from PIL import Image, ImageColor, ImageDraw
 from typing import Union, Optional
 
 from .elements import Frame
+from .nodes import Node, as_node, node_hash
 
 
 @dataclass(frozen=True)
@@ -25,21 +26,19 @@ class DivStyle:
     background_frame: Frame | None = None
 
 
-@lru_cache(maxsize=512)
-def rounded_rectangle(
+@lru_cache(maxsize=128)
+def _supersampled_rectangle(
     width: int,
     height: int,
-    radius: list[int],
+    radius: tuple[int],
     fill: str,
     border: int,
     border_color: str,
     scaleup: int = 3,
 ) -> Image.Image:
     '''
-    Creates an Image patch of a rectangle with rounded corners.
-
-    Each corner may have different radius, and optionally a border.
-    It is antialiased.
+    Draws the rounded rectangle at `scaleup` times the size and downsamples
+    it, which gives the antialiased corners.
     '''
     w = width * scaleup  # Scale up
     h = height * scaleup
@@ -77,6 +76,250 @@ def rounded_rectangle(
     return img.resize((width, height), resample=Image.LANCZOS)
 
 
+# Extra pixels around the corner tiles, so that the LANCZOS ringing of the
+# corners does not leak into the stretched edges. It grows with the border,
+# the edges of thicker borders only match the full rectangle further in.
+_SLICE_MARGIN = 3
+
+@lru_cache(maxsize=256)
+def _nine_slice_template(
+    radius: tuple[int],
+    fill: str,
+    border: int,
+    border_color: str,
+) -> tuple[Image.Image, tuple[int, int, int, int]]:
+    '''
+    Smallest rounded rectangle that holds all four corners, and a single
+    pixel row and column of edge in between them.
+
+    Returns the template and its slice lines (left, top, right, bottom).
+    '''
+    margin = _SLICE_MARGIN + border
+    left = max(radius[3], radius[2], border) + margin
+    right = max(radius[0], radius[1], border) + margin
+    top = max(radius[3], radius[0], border) + margin
+    bottom = max(radius[2], radius[1], border) + margin
+
+    img = _supersampled_rectangle(left + 1 + right, top + 1 + bottom, radius, fill, border, border_color)
+    return img, (left, top, left + 1, top + 1)
+
+
+@lru_cache(maxsize=256)
+def rounded_rectangle(
+    width: int,
+    height: int,
+    radius: tuple[int],
+    fill: str,
+    border: int,
+    border_color: str,
+) -> Image.Image:
+    '''
+    Creates an Image patch of a rectangle with rounded corners.
+
+    Each corner may have different radius, and optionally a border.
+    It is antialiased.
+
+    The antialiased corners are rendered once per (radius, colors, border)
+    and the box is assembled from them as a nine-slice: edges and center are
+    the template's middle row and column stretched to size.
+    '''
+    radius = tuple(radius)
+    template, (sl, st, sr, sb) = _nine_slice_template(radius, fill, border, border_color)
+    tw, th = template.size
+
+    if width < tw or height < th:
+        # Too small to slice, corners would overlap.
+        return _supersampled_rectangle(width, height, radius, fill, border, border_color).copy()
+
+    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    mid_w = width - sl - (tw - sr)
+    mid_h = height - st - (th - sb)
+    xs = [(0, sl, 0, sl), (sl, sr, sl, sl + mid_w), (sr, tw, sl + mid_w, width)]
+    ys = [(0, st, 0, st), (st, sb, st, st + mid_h), (sb, th, st + mid_h, height)]
+
+    for (x0, x1, dx0, dx1) in xs:
+        for (y0, y1, dy0, dy1) in ys:
+            patch = template.crop((x0, y0, x1, y1))
+            size = (dx1 - dx0, dy1 - dy0)
+            if patch.size != size:
+                patch = patch.resize(size, resample=Image.NEAREST)
+            img.paste(patch, (dx0, dy0))
+
+    return img
+
+
+@lru_cache(maxsize=64)
+def _solid_layer(size: tuple[int, int], background: str) -> Image.Image:
+    return Image.new('RGBA', size, ImageColor.getrgb(background))
+
+@lru_cache(maxsize=256)
+def _div_layers(
+    size: tuple[int, int],
+    inner_size: tuple[int, int],
+    offset: tuple[int, int],
+    frame_box: tuple[int, int, int, int],
+    radius: tuple[int],
+    background: str,
+    border: int,
+    border_color: str,
+    clip: bool,
+) -> tuple[Image.Image, Optional[Image.Image], Optional[Image.Image]]:
+    '''
+    Cached layers of a div on its full canvas: the rounded background with
+    border, the clip mask, and the clip mask cropped to the frame's box.
+
+    The masks are None when the div does not clip, and the frame's mask is
+    None when the frame is entirely inside the unclipped area.
+    '''
+    fill = Image.new('RGBA', size, (0, 0, 0, 0))
+    fill.alpha_composite(
+        rounded_rectangle(
+            width=inner_size[0],
+            height=inner_size[1],
+            radius=radius,
+            fill=background,
+            border=border,
+            border_color=border_color),
+        offset)
+
+    if not clip:
+        return fill, None, None
+
+    mask = Image.new('RGBA', size, (0, 0, 0, 0))
+    mask.alpha_composite(
+        rounded_rectangle(
+            width=inner_size[0],
+            height=inner_size[1],
+            radius=radius,
+            fill='#FFFFFF',
+            border=border,
+            border_color='#FFFFFF00'),
+        offset)
+    mask = mask.getchannel('A')
+    frame_mask = mask.crop(frame_box)
+    if frame_mask.getextrema() == (255, 255):
+        frame_mask = None
+    return fill, mask, frame_mask
+
+
+class Div(Node):
+    '''Layout node of `div`.'''
+
+    def __init__(
+        self,
+        child: Optional[Union[Node, Frame]] = None,
+        style: DivStyle = DivStyle(),
+        **kwargs,
+    ):
+        if kwargs:
+            style = dc_replace(style, **kwargs)
+        self.style = style
+        self.element = child
+        self.child = as_node(child) if child else None
+
+        if not self.child:
+            self.width, self.height = 1, 1
+            return
+
+        pad = style.padding
+        margin = style.margin
+        radius = style.radius
+
+        if isinstance(style.padding, int):
+            pad = (style.padding,) * 4
+        if isinstance(style.margin, int):
+            margin = (style.margin,) * 4
+        if isinstance(style.radius, int):
+            radius = (style.radius,) * 4
+
+        cw, ch = self.child.size
+        self.width = style.width or cw + (pad[1] + pad[3]) + (margin[1] + margin[3])
+        self.height = style.height or ch + (pad[0] + pad[2]) + (margin[0] + margin[2])
+        w_inner = style.width or cw + (pad[1] + pad[3])
+        h_inner = style.height or ch + (pad[0] + pad[2])
+
+        self.origin = (margin[3] + pad[3], margin[0] + pad[0])    # Origin of the frame in div.
+        self.solid = sum(radius) == 0 and sum(margin) == 0
+        # Part of the child within the div, it is cut off beyond that.
+        self.visible = (
+            max(0, min(cw, self.width - self.origin[0])),
+            max(0, min(ch, self.height - self.origin[1])),
+        )
+
+        if self.solid:
+            self.fill = _solid_layer(self.size, style.background)
+            self.mask, self.child_mask = None, None
+        else:
+            self.fill, self.mask, self.child_mask = _div_layers(
+                self.size,
+                (w_inner, h_inner),
+                (margin[1], margin[0]),
+                (*self.origin, self.origin[0] + cw, self.origin[1] + ch),
+                tuple(radius),
+                style.background,
+                style.border,
+                style.border_color,
+                style.clip)
+
+    @property
+    def hash(self):
+        if not self.child:
+            return ('div', self.style)
+        return ('div', self.style, node_hash(self.element))
+
+    def frame(self) -> Frame:
+        if not self.child:
+            return Frame.fallback(self.hash)
+        i = self.fill.copy()
+        self._render_content(i, 0, 0)
+        return Frame(i, hash=self.hash)
+
+    def render(self, dest: Image.Image, x: int, y: int):
+        if not self.child:
+            return
+        dest.alpha_composite(self.fill, (x, y))
+        self._render_content(dest, x, y)
+
+    def _render_content(self, dest: Image.Image, x: int, y: int):
+        '''Renders the child onto `dest` where the background is already drawn.'''
+        style = self.style
+        o_x, o_y = self.origin
+
+        if style.background_frame:
+            bg = style.background_frame.resize(self.size, ratio_fn=max)
+            bg = bg.image.crop((0, 0, *self.size))
+
+        if style.background_frame and self.solid:
+            dest.alpha_composite(bg, (x, y))
+            self._render_child(dest, x + o_x, y + o_y)
+        elif style.background_frame:
+            # The background image goes under the child, and both are clipped
+            # together, so they have to be flattened on their own layer first.
+            content = Image.new('RGBA', self.size, (0, 0, 0, 0))
+            content.alpha_composite(bg, (0, 0))
+            self._render_child(content, o_x, o_y)
+            if self.mask is not None:
+                # Pasting through the mask onto a transparent canvas scales
+                # every band, alpha included, in a single pass.
+                masked = Image.new('RGBA', self.size, (0, 0, 0, 0))
+                masked.paste(content, (0, 0), self.mask)
+                content = masked
+            dest.alpha_composite(content, (x, y))
+        elif self.child_mask is not None and all(self.visible):
+            masked = Image.new('RGBA', self.visible, (0, 0, 0, 0))
+            masked.paste(self.child.frame().image, (0, 0), self.child_mask)
+            dest.alpha_composite(masked, (x + o_x, y + o_y))
+        else:
+            self._render_child(dest, x + o_x, y + o_y)
+
+    def _render_child(self, dest: Image.Image, x: int, y: int):
+        if self.visible == self.child.size:
+            self.child.render(dest, x, y)
+        elif all(self.visible):
+            img = self.child.frame().image.crop((0, 0, *self.visible))
+            dest.alpha_composite(img, (x, y))
+
+
 def div(
     frame: Optional[Frame] = None,
     style: DivStyle = DivStyle(),
@@ -90,74 +333,7 @@ def div(
 
     Returns a new Frame.
     '''
-    if kwargs:
-        style = dc_replace(style, **kwargs)
-    if not frame:
-        return Frame.fallback(('div', style))
-
-    pad = style.padding
-    margin = style.margin
-    radius = style.radius
-
-    if isinstance(style.padding, int):
-        pad = (style.padding,) * 4
-    if isinstance(style.margin, int):
-        margin = (style.margin,) * 4
-    if isinstance(style.radius, int):
-        radius = (style.radius,) * 4
-
-    w = style.width or frame.width + (pad[1] + pad[3]) + (margin[1] + margin[3])
-    h = style.height or frame.height + (pad[0] + pad[2]) + (margin[0] + margin[2])
-    w_inner = style.width or frame.width + (pad[1] + pad[3])
-    h_inner = style.height or frame.height + (pad[0] + pad[2])
-
-    o_x = margin[3] + pad[3]    # Origin of the frame in div.
-    o_y = margin[0] + pad[0]
-
-    if sum(radius) == 0 and sum(margin) == 0:
-        i = Image.new('RGBA', (w, h), ImageColor.getrgb(style.background))
-        if style.background_frame:
-            bg = style.background_frame.resize((w, h), ratio_fn=max)
-            i.alpha_composite(bg.image, (0, 0))
-        i.alpha_composite(frame.image, (o_x, o_y))
-    else:
-        frame_div = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-
-        if style.background_frame:
-            bg = style.background_frame.resize((w, h), ratio_fn=max)
-            frame_div.alpha_composite(bg.image, (0, 0))
-
-        frame_div.alpha_composite(frame.image, (o_x, o_y))
-
-        i = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-        i.alpha_composite(
-            rounded_rectangle(
-                width=w_inner,
-                height=h_inner,
-                radius=radius,
-                fill=style.background,
-                border=style.border,
-                border_color=style.border_color),
-            (margin[1], margin[0]))
-        
-        if style.clip:
-            mask = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-            mask.alpha_composite(
-                rounded_rectangle(
-                    width=w_inner,
-                    height=h_inner,
-                    radius=radius,
-                    fill='#FFFFFF',
-                    border=style.border,
-                    border_color='#FFFFFF00'),
-                (margin[1], margin[0]))
-            masked_frame = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-            masked_frame = Image.composite(frame_div, masked_frame, mask)
-            i.alpha_composite(masked_frame, (0, 0))
-        else:
-            i.alpha_composite(frame_div, (0, 0))
-
-    return Frame(i, hash=('div', style, frame))
+    return Div(frame, style, **kwargs).frame()
 
 def styled_div(**kwargs):
     style = DivStyle(**kwargs)
@@ -4,18 +4,104 @@ Some of the functions are inspired with CSS FlexBoxes. Namely the
 horizontal and vertical alignments when differently sized elements
 are in the same container.
 '''
-from PIL import Image, ImageFilter
+from PIL import Image, ImageChops
 from typing import Literal, Optional, Type, Union, Sequence
 from itertools import product
-from functools import lru_cache
+
+from disinfo.utils.imops import blur_region
 
 from .elements import Frame
+from .nodes import Node, as_node, node_hash
 
 VerticalAlignment = Literal['center', 'top', 'bottom']
 HorizontalAlignment = Literal['center', 'left', 'right']
 ComposeAnchor = Literal['tl', 'tm', 'tr', 'ml', 'mm', 'mr', 'bl', 'bm', 'br']
 
 
+class HStack(Node):
+    '''Layout node of `hstack`.'''
+
+    def __init__(
+        self,
+        elements: Sequence[Optional[Union[Node, Frame]]],
+        gap: int = 0,
+        align: VerticalAlignment = 'center',
+    ):
+        self.elements = elements
+        self.gap = gap
+        self.align = align
+        self.children = [as_node(e) for e in elements if e]
+
+        if not self.children:
+            self.width, self.height = 1, 1
+            return
+
+        gap_width = gap * (len(self.children) - 1)
+        self.width = sum([e.width for e in self.children]) + gap_width
+        self.height = max([e.height for e in self.children])
+
+    @property
+    def hash(self):
+        if not self.children:
+            return ('hstack', self.gap, self.align, None)
+        return ('hstack', self.gap, self.align, tuple(node_hash(e) for e in self.elements))
+
+    def render(self, dest: Image.Image, x: int, y: int):
+        cx = x
+        for e in self.children:
+            if self.align == 'top':
+                cy = 0
+            elif self.align == 'center':
+                cy = (self.height - e.height) // 2
+            elif self.align == 'bottom':
+                cy = self.height - e.height
+            e.render(dest, cx, y + cy)
+            cx += e.width
+            cx += self.gap
+
+
+class VStack(Node):
+    '''Layout node of `vstack`.'''
+
+    def __init__(
+        self,
+        elements: Sequence[Optional[Union[Node, Frame]]],
+        gap: int = 0,
+        align: HorizontalAlignment = 'left',
+    ):
+        self.elements = elements
+        self.gap = gap
+        self.align = align
+        self.children = [as_node(e) for e in elements if e]
+
+        if not self.children:
+            self.width, self.height = 1, 1
+            return
+
+        gap_width = gap * (len(self.children) - 1)
+        self.width = max([e.width for e in self.children])
+        self.height = sum([e.height for e in self.children]) + gap_width
+
+    @property
+    def hash(self):
+        if not self.children:
+            return ('vstack', self.gap, self.align, None)
+        return ('vstack', self.gap, self.align, tuple(node_hash(e) for e in self.elements))
+
+    def render(self, dest: Image.Image, x: int, y: int):
+        cy = y
+        for e in self.children:
+            if self.align == 'left':
+                cx = 0
+            elif self.align == 'center':
+                cx = (self.width - e.width) // 2
+            elif self.align == 'right':
+                cx = self.width - e.width
+            e.render(dest, x + cx, cy)
+            cy += e.height
+            cy += self.gap
+
+
 def hstack(
     elements: Sequence[Optional[Frame]],
     gap: int = 0,
@@ -33,29 +119,7 @@ def hstack(
 
     Returns a new frame.
     '''
-    if not any(elements):
-        return Frame(Image.new('RGBA', (1, 1)), hash=('hstack', gap, align, None))
-
-    _elems = [e for e in elements if e]
-
-    gap_width = gap * (len(_elems) - 1)
-    width = sum([e.width for e in _elems]) + gap_width
-    height = max([e.height for e in _elems])
-    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-
-    x = 0
-    for e in _elems:
-        if align == 'top':
-            y = 0
-        elif align == 'center':
-            y = (height - e.height) // 2
-        elif align == 'bottom':
-            y = height - e.height
-        img.alpha_composite(e.image, (x, y))
-        x += e.width
-        x += gap
-
-    return Frame(img, hash=('hstack', gap, align, tuple(elements)))
+    return HStack(elements, gap, align).frame()
 
 def vstack(
     elements: Sequence[Optional[Frame]],
@@ -76,34 +140,23 @@ def vstack(
 
     Returns a new frame.
     '''
-    if not any(elements):
-        return Frame(Image.new('RGBA', (1, 1)), hash=('vstack', gap, align, None))
-
-    _elems = [e for e in elements if e]
-
-    gap_width = gap * (len(_elems) - 1)
-    width = max([e.width for e in _elems])
-    height = sum([e.height for e in _elems]) + gap_width
-
-    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    return VStack(elements, gap, align).frame()
 
-    y = 0
-    for e in _elems:
-        if align == 'left':
-            x = 0
-        elif align == 'center':
-            x = (width - e.width) // 2
-        elif align == 'right':
-            x = width - e.width
-        img.alpha_composite(e.image, (x, y))
-        y += e.height
-        y += gap
+def apply_blur(frame: Frame, radius: float) -> Frame:
+    blurred = blur_region(frame.image, (0, 0, frame.width, frame.height), radius)
+    return Frame(blurred, hash=('blur', radius, frame))
 
-    return Frame(img, hash=('vstack', gap, align, tuple(elements)))
+def _frost_alpha(region: Image.Image, overlay: Image.Image, threshold: int = 0, opaque: bool = False) -> Image.Image:
+    '''Keeps the `region` only where `overlay` is more opaque than `threshold`.
 
-@lru_cache(maxsize=256)
-def apply_blur(frame: Frame, radius: float) -> Frame:
-    return Frame(frame.image.filter(ImageFilter.GaussianBlur(radius)), hash=('blur', radius, frame))
+    With `opaque` the kept pixels are made fully opaque. Modifies `region`.
+    '''
+    lut = [0] * (threshold + 1) + [255] * (255 - threshold)
+    visible = overlay.getchannel('A').point(lut)
+    if not opaque:
+        visible = ImageChops.darker(region.getchannel('A'), visible)
+    region.putalpha(visible)
+    return region
 
 
 def composite_at(
@@ -169,13 +222,7 @@ def composite_at(
         raise ValueError('Wrong value for anchor.')
 
     def blend(left: Image.Image, right: Image.Image, threshold=1):
-        new_data = []
-        for (r, g, b, a), (_, _, _, fa) in zip(left.getdata(), right.getdata()):
-            comp = 255 if frost < 0 else a
-            alpha = 0 if fa <= threshold else comp
-            new_data.append((r, g, b, alpha))
-        left.putdata(new_data)
-        return left
+        return _frost_alpha(left, right, threshold, opaque=frost < 0)
 
     if frost != 0:
         if behind:
@@ -188,9 +235,7 @@ def composite_at(
 
             return composite_at(Frame(fg), dest, anchor)
         
-        bg = apply_blur(Frame(dest), abs(frost)).image
-        # bg = dest.filter(ImageFilter.GaussianBlur(abs(frost)))
-        region = bg.crop((left + dx, top + dy, left + dx  + fw, top + dy + fh))
+        region = blur_region(dest, (left + dx, top + dy, left + dx  + fw, top + dy + fh), abs(frost))
         dest.alpha_composite(blend(region, frame.image), (left + dx, top + dy))
 
     dest.alpha_composite(frame.image, (left + dx, top + dy))
@@ -291,18 +336,8 @@ def place_at(frame: Frame, dest: Union[Image.Image, Frame], x: int, y: int, anch
         raise ValueError('Wrong value for anchor.')
 
     if frost > 0:
-        bg = dest.filter(ImageFilter.GaussianBlur(frost))
-        region = bg.crop((x + dx, y + dy, x + dx + fw, y + dy + fh))
-
-        rg_data = region.getdata()
-        fr_data = frame.image.getdata()
-        new_data = []
-
-        for (r, g, b, a), (_, _, _, fa) in zip(rg_data, fr_data):
-            new_data.append((r, g, b, 0 if fa == 0 else a))
-        
-        region.putdata(new_data)
-        dest.alpha_composite(region, (x + dx, y + dy))
+        region = blur_region(dest, (x + dx, y + dy, x + dx + fw, y + dy + fh), frost)
+        dest.alpha_composite(_frost_alpha(region, frame.image), (x + dx, y + dy))
 
     dest.alpha_composite(frame.image, (x + dx, y + dy))
     return Frame(dest, hash=('place_at', anchor, frame))
@@ -0,0 +1,91 @@
+'''Retained layout tree.
+
+Layout functions like `hstack` and `div` return a new Frame at each level,
+so a nested widget copies its pixels once for every level it goes through.
+Nodes are measured when they are built, and `Node.frame` renders the whole
+tree in a single pass, blitting the leaf frames straight into the final
+image at their absolute positions:
+
+    VStack([
+        Div(HStack([icon, label], gap=2), style),
+        caption,
+    ]).frame()
+
+Frames can be used directly as children. The `HStack` and `VStack` nodes
+live in `layouts`, and `Div` in `layers`.
+'''
+from abc import ABCMeta, abstractmethod
+from PIL import Image
+from typing import Any, Union
+
+from .elements import Frame
+
+
+class Node(metaclass=ABCMeta):
+    width: int
+    height: int
+
+    @property
+    @abstractmethod
+    def hash(self) -> Any:
+        ...
+
+    @abstractmethod
+    def render(self, dest: Image.Image, x: int, y: int):
+        '''Composites the node onto `dest` with its top left corner at (x, y).'''
+        ...
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return (self.width, self.height)
+
+    def frame(self) -> Frame:
+        img = Image.new('RGBA', self.size, (0, 0, 0, 0))
+        self.render(img, 0, 0)
+        return Frame(img, hash=self.hash)
+
+
+class Leaf(Node):
+    __slots__ = ('content', 'width', 'height')
+
+    def __init__(self, content: Frame):
+        self.content = content
+        self.width = content.width
+        self.height = content.height
+
+    @property
+    def hash(self) -> Any:
+        return self.content
+
+    def render(self, dest: Image.Image, x: int, y: int):
+        dest.alpha_composite(self.content.image, (x, y))
+
+    def frame(self) -> Frame:
+        return self.content
+
+
+class Spacer(Node):
+    '''Empty node that only takes up space.'''
+    __slots__ = ('width', 'height')
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+
+    @property
+    def hash(self) -> Any:
+        return ('spacer', self.width, self.height)
+
+    def render(self, dest: Image.Image, x: int, y: int):
+        pass
+
+
+def as_node(element: Union[Node, Frame]) -> Node:
+    if isinstance(element, Node):
+        return element
+    return Leaf(element)
+
+def node_hash(element: Union[Node, Frame, None]) -> Any:
+    if isinstance(element, Node):
+        return element.hash
+    return element
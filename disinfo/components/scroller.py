@@ -40,6 +40,8 @@ class Scroller(metaclass=UniqInstance):
         self.scrollbar = scrollbar
         self.pause_offset = pause_offset
         self._last_target = 0
+        self.frame = None
+        self._source = None
         if not name:
             name = uname()
         self.name = name
@@ -77,7 +79,12 @@ class Scroller(metaclass=UniqInstance):
         return self
 
     def _init_scroller(self, frame: Frame, reset: bool):
-        self.frame = self._get_frame(frame)
+        # The padded strip is only rebuilt when the incoming image changes,
+        # callers tend to set the same frame on every draw.
+        source = (frame.image, self.size)
+        if self._source is None or self._source[0] is not source[0] or self._source[1] != source[1]:
+            self.frame = self._get_frame(frame)
+            self._source = source
         if reset:
             self.pos = 0
             self.last_step = 0
@@ -90,9 +97,6 @@ class Scroller(metaclass=UniqInstance):
     def _get_crop_rect(self):
         raise NotImplemented
 
-    def _get_image(self):
-        raise NotImplemented
-
     def _get_frame_size(self):
         raise NotImplemented
     
@@ -145,9 +149,9 @@ class Scroller(metaclass=UniqInstance):
 
     def draw(self, step: float) -> Frame:
         self._tick(step)
-        i = self._get_image()
-        patch_img = self.frame.image.crop(self._get_crop_rect())
-        i.alpha_composite(patch_img, (0, 0))
+        # Crop pads the area past the strip with transparent pixels, which is
+        # also what the start of the next loop looks like.
+        i = self.frame.image.crop(self._get_crop_rect())
         if self.scrollbar:
             ratio = self._get_scroll_ratio()
             thumb = self._get_scrollbar_thumb(5)
@@ -164,19 +168,15 @@ class HScroller(Scroller):
     def _get_crop_rect(self):
         # HACK!
         if self.static_if_small and self._true_w <= self.size:
-            return (self.size, 0, self.frame.width, self.frame.height)
+            return (self.size, 0, 2 * self.size, self.frame.height)
 
-        xspan = self.pos + self.size
         return (
             self.pos,
             0,
-            min(xspan, self.frame.width),
+            self.pos + self.size,
             self.frame.height,
         )
 
-    def _get_image(self):
-        return Image.new('RGBA', (self.size, self.frame.height))
-
     def _get_scroll_ratio(self):
         return self._true_w // self.size
 
@@ -206,18 +206,14 @@ class VScroller(Scroller):
 
     def _get_crop_rect(self):
         if self.static_if_small and self._true_h <= self.size:
-            return (0, self.size, self.frame.width, self.frame.height)
+            return (0, self.size, self.frame.width, 2 * self.size)
 
-        yspan = self.pos + self.size
         return (
             0,
             self.pos,
             self.frame.width,
-            min(yspan, self.frame.height),
+            self.pos + self.size,
         )
-
-    def _get_image(self):
-        return Image.new('RGBA', (self.frame.width, self.size))
     
     def _get_scroll_ratio(self):
         return self._true_h // self.size
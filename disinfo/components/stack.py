@@ -7,8 +7,9 @@ from disinfo.data_structures import FrameState, UniqInstance
 from disinfo.config import app_config
 
 from .elements import Frame
-from .layouts import vstack
-from .layers import div, DivStyle
+from .layouts import VStack
+from .layers import Div, DivStyle
+from .nodes import Spacer
 from .widget import Widget
 from .scroller import VScroller
 
@@ -24,6 +25,8 @@ class StackStyle:
     align: str = 'left'
 
 class Stack(metaclass=UniqInstance):
+    pin_offset: int = 32
+
     def __init__(self, name: str, style: StackStyle = StackStyle):
         self.name = name
         self.style = style
@@ -45,14 +48,62 @@ class Stack(metaclass=UniqInstance):
         self._widgets = sorted(widgets, key=lambda w: w.priority, reverse=True)
         return self
 
+    def _viewport(self, target: int, height: int) -> Optional[list[tuple[int, int]]]:
+        '''Row ranges of a surface of `height` that the scroller may show on
+        its next step. None when all of it is shown.
+        '''
+        size = self.style.size
+        if self.style.static_if_small and height <= size:
+            return None
+        # VScroller pads the surface with `size` rows on top and keeps its
+        # position modulo the padded height, so the window at position p
+        # covers rows [p - size, p) of the surface. The target can be
+        # negative on a short surface, in which case the scroller wraps.
+        period = height + size
+        pos = self.scroller.pos
+        step = max(self.style.scroll_delta, self.style.reverse_delta)
+        windows = []
+        for start, end in ((pos - step, pos + step + size), (target, target + size)):
+            if end - start >= period:
+                return None
+            length = end - start
+            start %= period
+            windows.append((start - size, min(start + length, period) - size))
+            if start + length > period:
+                windows.append((-size, start + length - period - size))
+        return windows
+
     def surface(self, fs: FrameState):
         curr_widget = self._widgets[self.pos]
         visible_widgets = [w for w in self._widgets if w.frame and (w.frame.width + w.frame.height) > 2]
         pos = visible_widgets.index(curr_widget) if curr_widget in visible_widgets else 0
-        frames = [w.draw(fs, active=i == pos and self.scroller.on_target) for i, w in enumerate(visible_widgets)]
-        pos = self.style.size - self.style.offset_top + sum([f.height for f in frames[0:pos]]) + (pos - 1 * 2)
-        return div(vstack(frames, gap=2, align=self.style.align), DivStyle(padding=(0, 0, 0, 2))), pos
-    
+        active = [i == pos and self.scroller.on_target for i in range(len(visible_widgets))]
+
+        # Lay the widgets out first, so that only the ones in view are drawn.
+        sizes = [w.measure(fs, active=a) for w, a in zip(visible_widgets, active)]
+
+        if None in sizes:
+            frames = [w.draw(fs, active=a) for w, a in zip(visible_widgets, active)]
+            heights = [f.height for f in frames]
+        else:
+            frames = None
+            heights = [h for _, h in sizes]
+
+        target = self.style.size - self.style.offset_top + sum(heights[0:pos]) + (pos - 1 * 2)
+
+        if frames is None:
+            windows = self._viewport(target - self.pin_offset, sum(heights) + 2 * (len(heights) - 1))
+            frames = []
+            y = 0
+            for w, a, size in zip(visible_widgets, active, sizes):
+                if windows is None or any(y < end and y + size[1] > start for start, end in windows):
+                    frames.append(w.draw(fs, active=a))
+                else:
+                    frames.append(Spacer(*size))
+                y += size[1] + 2
+
+        return Div(VStack(frames, gap=2, align=self.style.align), DivStyle(padding=(0, 0, 0, 2))).frame(), target
+
     def next_widget(self):
         self.pos += 1
         self.pos %= len(self._widgets)
@@ -104,6 +155,6 @@ class Stack(metaclass=UniqInstance):
             delta = self.style.reverse_delta
 
         # pin to middle
-        pos = pos - 32
+        pos = pos - self.pin_offset
 
         return self.scroller.set_frame(surface, reset=False).set_delta(delta).set_target(pos).draw(fs.tick)
@@ -116,8 +116,7 @@ class ScaleIn(TimedTransition[Frame]):
         return Frame(self.curr_value.image.resize(size=new_size), hash=self.hash)
 
 class Resize(TimedTransition[Frame]):
-    def draw(self, fs: FrameState) -> Optional[Frame]:
-        self.tick(fs.tick)
+    def _layout(self):
         pw, ph = 0, 0
         current = self.curr_value
         pos = self.pos
@@ -136,6 +135,16 @@ class Resize(TimedTransition[Frame]):
         qw, qh = dw * pos, dh * pos
 
         new_size = ensure_unity_int(pw + qw), ensure_unity_int(ph + qh)
+        return current, opacity_prev, opacity_curr, new_size
+
+    def measure(self, fs: FrameState) -> tuple[int, int]:
+        '''Size of the frame `draw` returns at this step, without drawing it.'''
+        self.tick(fs.tick)
+        return self._layout()[3]
+
+    def draw(self, fs: FrameState) -> Optional[Frame]:
+        self.tick(fs.tick)
+        current, opacity_prev, opacity_curr, new_size = self._layout()
 
         img = Image.new('RGBA', new_size, (0, 0, 0, 0))
 
@@ -218,10 +227,11 @@ class SlideIn(TimedTransition[Frame]):
             line = Image.new('RGBA', (self.curr_value.width - 2 * flip_margin, 1), (0, 0, 0, int(self.pos * 255) if self.pos < 0.5 else 80))
             if self.pos <= 0.5:
                 hpos = self.pos * 2
-                d = flip_margin * hpos * 3
+                # Whole pixels, so that the quads and their warp tables repeat.
+                d = round(flip_margin * hpos * 3)
                 src_t_pt = [(0, 0), (top_prev.width, 0), (top_prev.width, top_prev.height), (0, top_prev.height)]
                 dst_t_pt = [(-d, 0), (top_prev.width + d, 0), (top_prev.width - d, top_prev.height), (d, top_prev.height)]
-                top_prev = perspective_transform(top_prev, src_t_pt, dst_t_pt)
+                top_prev = perspective_transform(top_prev, src_t_pt, dst_t_pt, table=True)
                 top_prev = top_prev.resize((top_prev.width, ensure_unity_int((1 - hpos) * top_prev.height)))
                 top_curr = top_curr.crop((0, 0, top_curr.width, top_curr.height - top_prev.height))
                 place_at(Frame(top_curr).opacity(self.pos + 0.2), dest=i, x=0, y=-int(2 - (1 * hpos)), anchor='tl', frost=0)
@@ -230,11 +240,11 @@ class SlideIn(TimedTransition[Frame]):
             else:
                 place_at(Frame(top_curr), dest=i, x=0, y=0, anchor='tl', frost=0)
                 hpos =  (self.pos - 0.5) * 2
-                d = flip_margin * (1 - hpos) * 3
+                d = round(flip_margin * (1 - hpos) * 3)
                 if self.pos < 1:
                     src_t_pt = [(-d, 0), (bottom_curr.width + d, 0), (bottom_curr.width - d, bottom_curr.height), (d, bottom_curr.height)]
                     dst_t_pt = [(0, 0), (bottom_curr.width, 0), (bottom_curr.width, bottom_curr.height), (0, bottom_curr.height)]
-                    bottom_curr = perspective_transform(bottom_curr, src_t_pt, dst_t_pt)
+                    bottom_curr = perspective_transform(bottom_curr, src_t_pt, dst_t_pt, table=True)
                     bottom_curr = bottom_curr.resize((bottom_curr.width, ensure_unity_int(hpos * bottom_curr.height)))
                 # if self.pos < 1:
                 bottom_prev = bottom_prev.crop((0, bottom_curr.height, bottom_prev.width, bottom_prev.height))
@@ -26,6 +26,23 @@ class Widget:
     ease_in: ease.EasingFn = ease.cubic.cubic_in
     ease_out: ease.EasingFn = ease.cubic.cubic_out
 
+    def measure(self, fs: FrameState, active: bool = False) -> Optional[tuple[int, int]]:
+        '''Size of the frame `draw` would return, without drawing it.
+
+        Keeps the enter transition in step, so a widget that is not drawn
+        for a while still resizes as if it was. Only the Resize transition
+        can be measured, otherwise returns None.
+        '''
+        transition = self.transition_enter(f'{self.name}.resize', self.transition_duration, self.ease_in)
+        if type(transition) != Resize:
+            return None
+
+        hash_ = self.frame.hash if self.frame else ('widgetframe', self.name)
+        if transition.curr_value is None or hash(transition.curr_value) != hash(hash_):
+            style = dc_replace(self.style, border_color='#15559869' if active else '#00000098')
+            transition.mut(div(self.frame, style).tag(hash_))
+        return transition.measure(fs)
+
     def draw(self, fs: FrameState, active: bool = False) -> Optional[Frame]:
         style = dc_replace(self.style, border_color='#15559869' if active else '#00000098')
         transition = self.transition_enter(f'{self.name}.resize', self.transition_duration, self.ease_in)
@@ -68,6 +68,11 @@ class Config(AppBaseModel):
     brightness_divider: float = 400
     panel_gamma: float = 1.2
 
+    # Rendered SVG assets are kept here across restarts.
+    raster_cache_dir: str = '.cache/rasters'
+    # Remote images (album art, thumbnails), see `utils.remote_images`.
+    image_cache_dir: str = '.cache/images'
+
     udp_panel: list[UDPPanel] = []
 
     # Klipper
@@ -4,9 +4,9 @@ import datetime
 from traceback import format_exc
 from schedule import Scheduler
 
-from ..redis import publish
+from ..redis import publish, set_dict
 from .app_states import PubSubManager, PubSubMessage
-from . import idfm
+from . import idfm, printers
 
 
 class SafeScheduler(Scheduler):
@@ -46,6 +46,7 @@ def get_metro_info(force: bool = False):
     try:
         print('[i] [fetch] metro timing')
         data = idfm.fetch_state()
+        set_dict('metro.timing', data.model_dump(mode='json'))
         publish('di.pubsub.metro', action='update')
     except Exception as e:
         print('[e] metro_info', e)
@@ -59,6 +60,7 @@ def on_pubsub(channel_name: str, message: PubSubMessage):
 scheduler = SafeScheduler(reschedule_on_failure=True)
 
 scheduler.every(1).minutes.do(get_metro_info)
+scheduler.every(1).seconds.do(printers.publish_printers)
 
 
 def main():
@@ -66,6 +68,8 @@ def main():
 
     pubsub = PubSubManager()
     pubsub.attach('data_service', ('di.pubsub.dataservice',), on_pubsub)
+    printers.watch_printers()
+    printers.publish_printers(force=True)
 
     # Run all the jobs to begin, and then continue with schedule.
     scheduler.run_all(1)
@@ -1,11 +1,10 @@
 import asyncio
 import aiohttp
-import random
 import pendulum
 
 from datetime import datetime
 from idfm_api import IDFMApi
-from idfm_api.models import TransportType, LineData, StopData, TrafficData, InfoData
+from idfm_api.models import TrafficData, InfoData
 from pydantic import BaseModel
 
 from ..config import app_config
@@ -71,42 +70,6 @@ class MetroData(BaseModel):
     timestamp: datetime
 
 
-async def get_stop(line_name: str, stop_name: str = None) -> tuple[LineData, StopData]:
-    # we don't need this session, but it's required.
-    session = aiohttp.ClientSession()
-    idfm = IDFMApi(session, app_config.idfm_api_key)
-
-    _lines = await idfm.get_lines(TransportType.METRO)
-    line = [l for l in _lines if l.name == line_name][0]
-
-    _stops = await idfm.get_stops(line.id)
-
-    if stop_name:
-        stop = [s for s in _stops if s.name == stop_name][0]
-    else:
-        stop = random.choice(_stops)
-
-    await session.close()
-
-    return line, stop
-
-
-async def fetch_stop_traffic(stop_id: str) -> list[TrafficData]:
-    session = aiohttp.ClientSession()
-    idfm = IDFMApi(session, app_config.idfm_api_key)
-    traffic = await idfm.get_traffic(stop_id)
-    await session.close()
-    return traffic
-
-
-async def fetch_line_infos(line_id: str) -> list[InfoData]:
-    session = aiohttp.ClientSession()
-    idfm = IDFMApi(session, app_config.idfm_api_key)
-    infos = await idfm.get_infos(line_id)
-    await session.close()
-    return infos
-
-
 def is_active():
     t = pendulum.now()
     time = pendulum.time
@@ -145,21 +108,49 @@ def collate_info(infos: list[InfoData]):
     }
 
 
-def fetch_state():
+# Seconds, for each request to the IDFM api.
+REQUEST_TIMEOUT = 10
+
+async def _fetch_all(timeout: float) -> tuple[list[list[TrafficData]], dict[str, list[InfoData]]]:
+    '''
+    Fetches the traffic of all the stops and the infos of all the lines
+    concurrently, over a single pooled session.
+    '''
+    line_ids = list(dict.fromkeys(s['line_id'] for s in traffic_stops + line_infos))
+
+    async with aiohttp.ClientSession() as session:
+        idfm = IDFMApi(session, app_config.idfm_api_key, timeout=timeout)
+        results = await asyncio.gather(
+            *[idfm.get_traffic(s['stop_id']) for s in traffic_stops],
+            *[idfm.get_infos(line_id) for line_id in line_ids],
+            return_exceptions=True,
+        )
+
+    # A failing stop or line shows up empty instead of dropping the others.
+    for i, r in enumerate(results):
+        if isinstance(r, Exception):
+            print('[e] idfm', r)
+            results[i] = []
+
+    traffic = results[:len(traffic_stops)]
+    infos = dict(zip(line_ids, results[len(traffic_stops):]))
+    return traffic, infos
+
+
+def fetch_state(timeout: float = REQUEST_TIMEOUT) -> MetroData:
     trains = []
     infos = []
 
-    for s in traffic_stops:
-        traffic = asyncio.run(fetch_stop_traffic(s['stop_id']))
-        info = asyncio.run(fetch_line_infos(s['line_id']))
+    all_traffic, all_infos = asyncio.run(_fetch_all(timeout))
+
+    for s, traffic in zip(traffic_stops, all_traffic):
         timings = list(collate_train_time(traffic, s['direction']))
-        information = collate_info(info)
+        information = collate_info(all_infos[s['line_id']])
         trains.append({**s, 'timings': timings, 'information': information})
         infos.append({**s, **information})
 
     for s in line_infos:
-        info = asyncio.run(fetch_line_infos(s['line_id']))
-        information = collate_info(info)
+        information = collate_info(all_infos[s['line_id']])
         infos.append({**s, **information})
 
     return MetroData(trains=trains, information=infos, timestamp=pendulum.now())
@@ -0,0 +1,163 @@
+'''
+Printer states, derived from the HA entities in the data service.
+
+The states are rebuilt when one of the printer entities changes, stored in
+redis under `printers.state` and announced on `di.pubsub.printers`. The
+renderer only loads the snapshot and draws it.
+
+The camera urls are the plain HA proxy urls: the renderer fetches the
+snapshots again on its own cadence, see `remote_image`.
+'''
+import threading
+import pendulum
+
+from typing import Optional
+
+from disinfo.config import app_config
+from disinfo.data_structures import AppBaseModel
+from disinfo.redis import publish, set_dict
+from disinfo.utils.hass import Entity, HaWS
+
+# Domains of the printer entities, named `<domain>.<printer id>_*`.
+DOMAINS = ('sensor', 'camera', 'image')
+
+_changed = threading.Event()
+
+
+class PrinterState(AppBaseModel):
+    printer_id: str
+
+    bed_temp: Optional[float] = None
+    extruder_temp: Optional[float] = None
+    progress: Optional[float] = None
+    state: Optional[str] = None
+    current_stage: Optional[str] = None
+    filename: Optional[str] = None
+    thumbnail: Optional[str] = None
+    cover_image: Optional[str] = None
+    pick_image: Optional[str] = None
+
+    online: bool = False
+    is_definitely_online: bool = False
+    printer_name: str | None = None
+
+    eta: Optional[str] = None
+
+    completion_time: Optional[str] = ''
+    time_left: Optional[str] = ''
+    source_timezone: str = 'local'
+
+    is_on: bool = False
+    is_visible: bool = False
+    is_done: bool = False
+    is_printing: bool = False
+
+    _id: str = 'klipper'
+
+    def seconds_left(self, now: pendulum.DateTime) -> int:
+        if not self.eta:
+            return -1
+
+        eta = pendulum.parse(self.eta, tz=self.source_timezone).in_tz(tz='local')
+        return (eta - now).total_seconds()
+
+
+class PrinterStates(AppBaseModel):
+    printers: list[PrinterState] = []
+
+
+def _picture_url(entity: Entity | None) -> Optional[str]:
+    if not entity:
+        return None
+    return app_config.ha_base_url + entity.attributes.get('entity_picture', '')
+
+def _printers() -> list[tuple[str, str]]:
+    return [tuple(printer.split(':')) for printer in app_config.printer_ids]
+
+
+def get_moonraker_state(printer_id: str):
+    cam = HaWS().get_entity(f'camera.{printer_id}_libcamera')
+    ignored_states = ['unknown', 'unavailable']
+    thumburl = _picture_url(cam)
+    get_sensor = lambda sensor: x.state if (x := HaWS().get_entity(f'sensor.{printer_id}_{sensor}')) and x.state not in ignored_states else None
+
+    state = PrinterState(
+        printer_id=printer_id,
+        bed_temp=float(get_sensor('bed_temperature') or '-42'),
+        extruder_temp=float(get_sensor('nozzle_temperature') or '-42'),
+        progress=int(float(get_sensor('progress') or '0')),
+        state=get_sensor('current_print_state'),
+        filename=get_sensor('filename'),
+        thumbnail=thumburl,
+        online=True,
+        is_on=get_sensor('printer_state') not in ('offline', 'unknown'),
+        is_printing=get_sensor('printer_state') in ('printing', 'pause', 'running'),
+        is_done=get_sensor('printer_state') == 'finish',
+        completion_time=pendulum.parse(x).strftime('%H:%M') if (x := get_sensor('print_eta')) else None,
+        time_left=get_sensor('print_time_left'),
+        eta=get_sensor('print_eta'),
+        printer_name=printer_id,
+    )
+    state.is_visible=get_sensor('printer_state') not in ('offline', 'unknown') and state.state is not None
+    return state
+
+def get_bambulab_state(printer_id: str):
+    cam = HaWS().get_entity(f'camera.{printer_id}_camera')
+    cover = HaWS().get_entity(f'image.{printer_id}_cover_image')
+    pick_img = HaWS().get_entity(f'image.{printer_id}_pick_image')
+    thumburl = _picture_url(cam)
+    coverurl = _picture_url(cover)
+    pickurl = _picture_url(pick_img)
+    get_sensor = lambda sensor: x.state if (x := HaWS().get_entity(f'sensor.{printer_id}_{sensor}')) and x.state != 'unavailable' else None
+
+    state = PrinterState(
+        printer_id=printer_id,
+        bed_temp=float(get_sensor('bed_temperature') or '-42'),
+        extruder_temp=float(get_sensor('nozzle_temperature') or '-42'),
+        progress=int(get_sensor('print_progress') or '0'),
+        state=get_sensor('print_status'),
+        filename=get_sensor('task_name'),
+        thumbnail=thumburl,
+        online=True,
+        is_on=get_sensor('print_status') not in ('offline', 'unknown'),
+        is_printing=get_sensor('print_status') in ('printing', 'pause', 'running'),
+        is_done=get_sensor('print_status') == 'finish',
+        completion_time=pendulum.parse(x).strftime('%H:%M') if (x := get_sensor('end_time')) else None,
+        time_left=get_sensor('remaining_time'),
+        eta=get_sensor('end_time'),
+        printer_name=get_sensor('printer_name'),
+        cover_image=coverurl,
+        pick_image=pickurl,
+        current_stage=get_sensor('current_stage'),
+    )
+    state.is_visible=get_sensor('print_status') not in ('offline', 'unknown') and state.state is not None
+    return state
+
+def get_state() -> PrinterStates:
+    printers = []
+    for model, printer_id in _printers():
+        if model == 'bambu':
+            printers.append(get_bambulab_state(printer_id))
+        elif model == 'klipper':
+            printers.append(get_moonraker_state(printer_id))
+    return PrinterStates(printers=printers)
+
+
+def watch_printers():
+    '''Marks the states as changed on any update of a printer entity.'''
+    for _, printer_id in _printers():
+        for domain in DOMAINS:
+            HaWS().watch(f'{domain}.{printer_id}_', lambda entity: _changed.set())
+
+def publish_printers(force: bool = False):
+    if not (force or _changed.is_set()):
+        return
+    # Cleared first, so that a change during the build is not lost; and set
+    # again on failure, so that the build is retried on the next run.
+    _changed.clear()
+    try:
+        set_dict('printers.state', get_state().model_dump(mode='json'))
+    except Exception:
+        _changed.set()
+        raise
+    publish('di.pubsub.printers', action='update')
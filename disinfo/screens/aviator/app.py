@@ -1,5 +1,7 @@
 import cairocffi as cairo
-from functools import cache
+import numpy as np
+
+from functools import cache, lru_cache
 
 from cairosvg.parser import Tree
 from cairosvg.surface import PNGSurface
@@ -12,15 +14,15 @@ from disinfo.components.layouts import hstack, vstack, composite_at
 from disinfo.components.text import TextStyle, text
 from disinfo.components.transitions import text_slide_in
 from disinfo.components import fonts
-from disinfo.utils.cairo import load_svg_string, load_svg, to_pil
+from disinfo.utils.cairo import load_svg_string, load_svg, pooled_surface, to_pil
 from disinfo.screens.colors import gray
 from disinfo.config import app_config
 
 from .state import ADSBxStateManager
-from .markers import shapes, svg_shape_to_svg, get_base_marker
-from .colors import marker_color
+from .colors import BAND_HEIGHT, band_color, tickpoints
+from .sprites import marker_sprite
 from .flags import find_icao_range
-from .utils import lat_long_zoom_to_xy, bbox, scale_xy_to_screen
+from .utils import lat_long_zoom_to_xy, bbox, scale_xy_to_screen, project_to_screen
 
 
 
@@ -46,28 +48,40 @@ def load_map() -> cairo.ImageSurface:
     return surface
 
 
-@cache
-def flight_icon(category: str, altitude: float, track: float, scalefactor: float = 0.6) -> cairo.ImageSurface:
-    shape_name, scale = get_base_marker(category, altitude=altitude)
-    shape = shapes[shape_name]
+_TRAIL_POINTS = 400
 
-    alt = altitude or 0
-    alt = 0 if type(alt) == str else alt * 0.3048
-    
-    svg = svg_shape_to_svg(
-        shape,
-        fillColor=marker_color(alt).hex,
-        strokeColor=marker_color(alt).hex,
-        strokeWidth=0.5,
-        scale=scalefactor*scale,
-        angle=track,
-    )
-
-    with open(f'assets/{shape_name}.svg', 'w') as fp:
-        fp.write(svg)
+@lru_cache(maxsize=256)
+def _trail_color(band: int) -> tuple[float, float, float]:
+    return band_color(band).darken(0.2).rgb
 
-    surface = PNGSurface(Tree(bytestring=svg.encode()), None, 1).cairo
-    return surface
+def draw_trails(ctx: cairo.Context, trails: list[list], box: tuple):
+    '''
+    Strokes the trails, lists of (lat, lon, alt, track, ...) positions, with
+    each segment colored by the altitude of its end point.
+
+    All the points are projected in one batch, and the segments are stroked
+    as a single path per altitude band.
+    '''
+    trails = [t for t in trails if len(t) > 1]
+    if not trails:
+        return
+    lat, lon, alt = np.concatenate([np.asarray(t, dtype=float)[:, :3] for t in trails]).T
+    xs, ys = project_to_screen(lat, lon, box)
+    # Feet to meters, points without altitude get no segment.
+    bands = np.floor(np.clip(alt * 0.3048, tickpoints[0], tickpoints[-1]) / BAND_HEIGHT)
+
+    starts = np.cumsum([0] + [len(t) for t in trails[:-1]])
+    has_prev = np.ones(len(xs), dtype=bool)
+    has_prev[starts] = False
+    segments = np.flatnonzero(has_prev & ~np.isnan(bands))
+
+    ctx.set_line_width(1)
+    for band in np.unique(bands[segments]):
+        for i in segments[bands[segments] == band]:
+            ctx.move_to(xs[i - 1], ys[i - 1])
+            ctx.line_to(xs[i], ys[i])
+        ctx.set_source_rgba(*_trail_color(int(band)), 1)
+        ctx.stroke()
 
 
 class RadarSurface:
@@ -76,8 +90,6 @@ class RadarSurface:
 
 
 def radar(fs: FrameState) -> Frame:
-    import geopy.distance
-    state = ADSBxStateManager().get_state(fs)
     w = app_config.width
     h = app_config.height
 
@@ -93,7 +105,7 @@ def radar(fs: FrameState) -> Frame:
 
     rmax = max(w, h)
 
-    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
+    surface = pooled_surface(w, h, 'aviator.radar')
     ctx = cairo.Context(surface)
     nrings = 5
 
@@ -118,45 +130,21 @@ def radar(fs: FrameState) -> Frame:
     #     ctx.arc(cx, cy, radius, 0, 2 * math.pi)
     #     ctx.fill()
 
-    for plane in state:
-        if geopy.distance.distance(center, (plane['lat'], plane['lon'])).m > max(span) + 1_000:
-            continue
+    planes = ADSBxStateManager().index.within(max(span) / 1000 + 1, center)
+    for plane in planes:
         if plane['alt_baro'] == 'ground':
             plane['alt_baro'] = 0
 
+    draw_trails(ctx, [p['positions'][-_TRAIL_POINTS:] for p in planes if p['alt_baro'] < 25000], box)
+
+    img = to_pil(surface)
+    xs, ys = project_to_screen([p['lat'] for p in planes], [p['lon'] for p in planes], box)
+    for plane, sx, sy in zip(planes, xs, ys):
         try:
-            # flight = flight_icon(plane['category'], 1000, plane['track'])
-            flight = flight_icon(plane['category'], plane['alt_baro'], plane['track'], 0.3 if plane['alt_baro'] > 15000 else 0.5)
-            iw = flight.get_width()
-            ih = flight.get_height()
+            scale = 0.3 if plane['alt_baro'] > 15000 else 0.5
+            flight = marker_sprite(plane['category'], plane['alt_baro'], plane['track'], scale, stroke_width=0.5)
         except KeyError:
             continue
-        sx, sy = scale_xy_to_screen(*lat_long_zoom_to_xy(plane['lat'], plane['lon']), box)
-
-        positions = []
-        max_pos = 400
-        positions = plane['positions'][-max_pos:]
-
-        if plane['alt_baro'] < 25000:
-            for i, (lat, lon, alt, track) in enumerate(positions):
-                if alt is None:
-                    continue
-                alt *= 0.3048
-                x, y = scale_xy_to_screen(*lat_long_zoom_to_xy(lat, lon), box)
-                if i == 0:
-                    ctx.move_to(x, y)
-                else:
-                    prev_pos = positions[i - 1]
-                    px, py = scale_xy_to_screen(*lat_long_zoom_to_xy(prev_pos[0], prev_pos[1]), box)
-                    ctx.move_to(px, py)
-                ctx.set_source_rgba(*marker_color(alt).darken(0.2).rgb, 255)#max_pos - i / max_pos)
-                # positions.append((x, y, marker_color(alt).rgba))
-                ctx.line_to(x, y)
-                ctx.set_line_width(1)
-                # ctx.arc(x, y, 0.5, 0, 2 * math.pi)
-                ctx.stroke()
-
-        ctx.set_source_surface(flight, sx - iw / 2, sy - ih / 2)
-        ctx.paint()
-    
-    return Frame(to_pil(surface)).tag('radar')
+        img.alpha_composite(flight.image, (round(sx - flight.width / 2), round(sy - flight.height / 2)))
+
+    return Frame(img).tag('radar')
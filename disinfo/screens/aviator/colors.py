@@ -1,4 +1,6 @@
 import spectra
+
+from functools import lru_cache
 from disinfo.screens.colors import AppColor
 
 
@@ -22,3 +24,16 @@ def marker_color(altitude: float):
     elif altitude > tickpoints[-1]:
         altitude = tickpoints[-1]
     return AppColor(scale(altitude).hexcode)
+
+
+# Markers and trails are colored by altitude bands of this many meters.
+BAND_HEIGHT = 100
+
+def altitude_band(altitude: float) -> int:
+    if type(altitude) == str:
+        altitude = 0
+    return int(min(max(altitude, tickpoints[0]), tickpoints[-1]) // BAND_HEIGHT)
+
+@lru_cache(maxsize=256)
+def band_color(band: int) -> AppColor:
+    return marker_color(band * BAND_HEIGHT)
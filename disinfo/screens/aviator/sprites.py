@@ -0,0 +1,54 @@
+'''
+Aircraft marker sprites.
+
+Markers are rendered per shape, altitude color band and heading rounded to
+`HEADING_STEP` degrees, so that planes reuse the same few rasters between
+polls. Rendering goes through `rasterize_svg`, which keeps them on disk.
+'''
+from functools import lru_cache
+
+from disinfo.components.elements import Frame
+from disinfo.utils.cairo import rasterize_svg
+
+from .colors import altitude_band, band_color
+from .markers import shapes, svg_shape_to_svg, get_base_marker
+
+HEADING_STEP = 5
+
+
+@lru_cache(maxsize=2048)
+def _sprite(shape_name: str, scale: float, band: int, heading: int, stroke_width: float) -> Frame:
+    color = band_color(band).hex
+    svg = svg_shape_to_svg(
+        shapes[shape_name],
+        fillColor=color,
+        strokeColor=color,
+        strokeWidth=stroke_width,
+        scale=scale,
+        angle=heading,
+    )
+    return Frame(rasterize_svg(svg.encode()), hash=('aviator.sprite', shape_name, scale, band, heading, stroke_width))
+
+def marker_sprite(
+    category: str,
+    altitude: float | str | None,
+    track: float | None,
+    scale: float = 0.6,
+    stroke_width: float = 0,
+    rotation: float = 0,
+) -> Frame:
+    '''
+    Marker of the aircraft `category`, colored by its barometric `altitude`
+    (feet) and pointing at `track` (degrees) plus `rotation`.
+
+    Raises KeyError when the category has no marker shape.
+    '''
+    shape_name, shape_scale = get_base_marker(category, altitude=altitude)
+    if shape_name not in shapes:
+        raise KeyError(shape_name)
+
+    alt = altitude or 0
+    alt = 0 if type(alt) == str else alt * 0.3048
+    heading = round(((track or 0) + rotation) / HEADING_STEP) * HEADING_STEP % 360
+
+    return _sprite(shape_name, scale * shape_scale, altitude_band(alt), heading, stroke_width)
@@ -1,15 +1,36 @@
+import time
 import pendulum
 
 from typing import Optional
 from datetime import datetime
 
+from disinfo.config import app_config
 from disinfo.data_structures import FrameState, AppBaseModel
 from disinfo.drat.app_states import PubSubStateManager, PubSubMessage
 
+from .tracks import PlaneIndex, TrackStore
+
 class ADSBxStateManager(PubSubStateManager[list]):
     model = list
     channels = ('di.pubsub.aviator',)
 
+    def __init__(self):
+        self.tracks = TrackStore()
+        self.index = PlaneIndex([], self.home)
+        super().__init__()
+
+    @property
+    def home(self) -> tuple[float, float]:
+        return app_config.latitude, app_config.longitude
+
     def process_message(self, channel: str, data: PubSubMessage):
         if data.action == 'update':
-            self.state = data.payload['planes']
+            for hexid, points in data.payload.get('tracks', {}).items():
+                self.tracks.extend(hexid, points)
+            self.tracks.evict(time.time())
+
+            planes = data.payload['planes']
+            for plane in planes:
+                plane['positions'] = self.tracks.trail(plane['hex'])
+            self.index = PlaneIndex(planes, self.home)
+            self.state = planes
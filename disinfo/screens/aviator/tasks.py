@@ -1,15 +1,10 @@
 import time
 import requests
 
-from collections import defaultdict
-
 from disinfo.config import app_config
 from disinfo.redis import publish
 
-
-def distance_to_home(lat: float, lon: float) -> float:
-    import geopy.distance
-    return geopy.distance.distance((lat, lon), (app_config.latitude, app_config.longitude)).km
+from .tracks import PlaneIndex, TrackStore
 
 
 def fetch_planes():
@@ -21,7 +16,7 @@ def fetch_planes():
 
     return data['aircraft']
 
-positions = defaultdict(list)
+tracks = TrackStore()
 
 
 def fetch_closest_planes():
@@ -32,23 +27,21 @@ def fetch_closest_planes():
     for plane in planes:
         if 'lat' not in plane or 'lon' not in plane or 'alt_baro' not in plane or not plane.get('flight'):
             continue
-        plane['distance'] = distance_to_home(plane['lat'], plane['lon'])
-
-        # TODO: the positions array grows indefinitely.
-        positions[plane['hex']].append((plane['lat'], plane['lon'], plane['alt_baro'], plane.get('track'), now))
-        plane['positions'] = positions[plane['hex']]
+        tracks.append(plane['hex'], plane['lat'], plane['lon'], plane['alt_baro'], plane.get('track'), now)
+        planes_with_pos.append(plane)
 
-        if len(plane['positions']) > 400:
-            del plane['positions'][:-400]
+    tracks.evict(now)
 
-        # planes_with_pos.append(plane)
-    
-    for hex, pos in positions.items():
-        if now - pos[-1][-1] > 60 * 60:
-            del positions[hex]
+    index = PlaneIndex(planes_with_pos, (app_config.latitude, app_config.longitude))
+    closest = []
+    for distance, plane in index.closest(50):
+        plane['distance'] = distance
+        closest.append(plane)
 
     return {
-        'planes': sorted(planes_with_pos, key=lambda x: x['distance'])[:50],
+        'planes': closest,
+        # Only the points since the last publish, subscribers keep the trails.
+        'tracks': tracks.deltas(),
     }
 
 
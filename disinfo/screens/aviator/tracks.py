@@ -0,0 +1,135 @@
+'''
+Aircraft tracks kept in fixed-size ring buffers.
+
+The poller appends a point per aircraft on each poll and publishes only the
+points added since the previous publish. Subscribers apply these deltas to
+their own store to rebuild the trails, so neither memory nor the pubsub
+payload grows with how long a plane has been tracked.
+
+`PlaneIndex` answers the distance queries over the latest positions.
+'''
+import numpy as np
+
+from collections import OrderedDict
+from scipy.spatial import cKDTree
+
+from .utils import local_xy
+
+# Columns of a track point.
+LAT, LON, ALT, TRACK, T = range(5)
+
+
+class Track:
+    __slots__ = ('points', 'count', 'published')
+
+    def __init__(self, capacity: int):
+        self.points = np.full((capacity, 5), np.nan)
+        # Total points ever appended, the ring index is count % capacity.
+        self.count = 0
+        self.published = 0
+
+    @property
+    def last_seen(self) -> float:
+        return self.points[(self.count - 1) % len(self.points), T]
+
+    def append(self, point: tuple):
+        self.points[self.count % len(self.points)] = point
+        self.count += 1
+
+    def latest(self, n: int) -> np.ndarray:
+        '''The last n points (at most the capacity), oldest first.'''
+        capacity = len(self.points)
+        n = min(n, self.count, capacity)
+        idx = np.arange(self.count - n, self.count) % capacity
+        return self.points[idx]
+
+    def trail(self) -> np.ndarray:
+        return self.latest(self.count)
+
+
+class TrackStore:
+    def __init__(self, capacity: int = 400, max_tracks: int = 1000, idle_seconds: float = 60 * 60):
+        self.capacity = capacity
+        self.max_tracks = max_tracks
+        self.idle_seconds = idle_seconds
+        # Least recently updated first.
+        self.tracks: OrderedDict[str, Track] = OrderedDict()
+
+    def __contains__(self, hexid: str) -> bool:
+        return hexid in self.tracks
+
+    def append(self, hexid: str, lat: float, lon: float, alt, track, t: float):
+        if alt == 'ground':
+            alt = 0
+        point = tuple(np.nan if v is None else v for v in (lat, lon, alt, track, t))
+
+        if hexid not in self.tracks:
+            self.tracks[hexid] = Track(self.capacity)
+        self.tracks[hexid].append(point)
+        self.tracks.move_to_end(hexid)
+
+        while len(self.tracks) > self.max_tracks:
+            self.tracks.popitem(last=False)
+
+    def extend(self, hexid: str, points: list):
+        for point in points:
+            self.append(hexid, *point)
+
+    def trail(self, hexid: str) -> np.ndarray:
+        if hexid not in self.tracks:
+            return np.empty((0, 5))
+        return self.tracks[hexid].trail()
+
+    def evict(self, now: float) -> list[str]:
+        '''Drops the tracks that were not updated for `idle_seconds`.'''
+        idle = [k for k, v in self.tracks.items() if now - v.last_seen > self.idle_seconds]
+        for hexid in idle:
+            del self.tracks[hexid]
+        return idle
+
+    def deltas(self) -> dict[str, list]:
+        '''Points appended since the last call, per aircraft.'''
+        deltas = {}
+        for hexid, track in self.tracks.items():
+            if track.count == track.published:
+                continue
+            points = track.latest(track.count - track.published)
+            deltas[hexid] = [[None if np.isnan(v) else v for v in p] for p in points.tolist()]
+            track.published = track.count
+        return deltas
+
+
+class PlaneIndex:
+    '''
+    KD-tree over the plane positions, projected in km around `origin`.
+
+    Queries are answered without computing the distance of every plane.
+    '''
+    def __init__(self, planes: list[dict], origin: tuple[float, float]):
+        self.planes = planes
+        self.origin = origin
+        self.tree = None
+        if planes:
+            xy = local_xy([p['lat'] for p in planes], [p['lon'] for p in planes], origin)
+            self.tree = cKDTree(xy)
+
+    def _point(self, center: tuple[float, float] | None) -> np.ndarray:
+        if center is None:
+            return np.zeros(2)
+        return local_xy(center[0], center[1], self.origin)[0]
+
+    def closest(self, n: int, center: tuple[float, float] | None = None) -> list[tuple[float, dict]]:
+        '''Up to `n` (distance km, plane) pairs closest to `center`, nearest first.'''
+        if self.tree is None or n <= 0:
+            return []
+        dist, idx = self.tree.query(self._point(center), k=min(n, len(self.planes)))
+        return [(float(d), self.planes[i]) for d, i in zip(np.atleast_1d(dist), np.atleast_1d(idx))]
+
+    def within(self, radius: float, center: tuple[float, float] | None = None) -> list[dict]:
+        '''Planes within `radius` km of `center`, nearest first.'''
+        if self.tree is None:
+            return []
+        point = self._point(center)
+        idx = self.tree.query_ball_point(point, radius)
+        dist = np.hypot(*(self.tree.data[idx] - point).T) if idx else []
+        return [self.planes[i] for _, i in sorted(zip(dist, idx))]
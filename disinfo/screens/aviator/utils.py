@@ -1,5 +1,6 @@
 import math
 import cartopy
+import numpy as np
 
 from disinfo.config import app_config
 
@@ -28,3 +29,28 @@ def scale_xy_to_screen(x: float, y: float, bbox: tuple):
     x = (x - bbox[0][0]) / (bbox[1][0] - bbox[0][0]) * order
     y = (y - bbox[0][1]) / (bbox[1][1] - bbox[0][1]) * order
     return y, order - x
+
+
+def local_xy(lat, lon, origin: tuple[float, float]):
+    '''
+    Equirectangular projection in km around `origin` (lat, lon), as an
+    (n, 2) array. Distances are within a fraction of a percent of the great
+    circle ones at the radar's range.
+    '''
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    x = np.radians(lon - origin[1]) * math.cos(math.radians(origin[0])) * earth_radius
+    y = np.radians(lat - origin[0]) * earth_radius
+    return np.column_stack([x, y])
+
+def project_to_screen(lat, lon, bbox: tuple):
+    '''
+    Batch version of `lat_long_zoom_to_xy` followed by `scale_xy_to_screen`.
+    Returns the screen x and y arrays.
+    '''
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if not lat.size:
+        return np.empty(0), np.empty(0)
+    xy = screen_transform.transform_points(source_transform, lat, lon)
+    return scale_xy_to_screen(xy[:, 0], xy[:, 1], bbox)
@@ -13,28 +13,12 @@ from disinfo.screens.colors import gray
 from disinfo.config import app_config
 
 from .state import ADSBxStateManager
-from .markers import shapes, svg_shape_to_svg, get_base_marker
-from .colors import marker_color
+from .sprites import marker_sprite
 from .flags import find_icao_range
 
 
-def flight_icon(category: str, altitude: float, track: float) -> str:
-    shape_name, scale = get_base_marker(category, altitude=altitude)
-    shape = shapes[shape_name]
-
-    alt = altitude or 0
-    alt = 0 if type(alt) == str else alt * 0.3048
-    
-    svg = svg_shape_to_svg(
-        shape,
-        fillColor=marker_color(alt).hex,
-        strokeColor=marker_color(alt).hex,
-        strokeWidth=0,
-        scale=0.6*scale,
-        angle=track - 90,
-    )
-
-    return load_svg_string(svg)
+def flight_icon(category: str, altitude: float, track: float) -> Frame:
+    return marker_sprite(category, altitude, track, scale=0.6, rotation=-90)
 
 @cache
 def flag(hexid: str) -> Frame:
@@ -135,8 +119,8 @@ sample_plane = {
 
 
 def planes(fs: FrameState) -> list[Widget]:
-    planes = ADSBxStateManager().get_state(fs)
+    planes = ADSBxStateManager().index.within(8)
     # if app_config.devmode:
     #     planes = [sample_plane]
-    widgets = [airplane_widget(fs, plane) for plane in planes if plane['distance'] <= 8]
+    widgets = [airplane_widget(fs, plane) for plane in planes]
     return widgets
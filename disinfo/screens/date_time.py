@@ -1,5 +1,8 @@
+import itertools
 import random
+import numpy as np
 
+from functools import cache
 from PIL import Image, ImageDraw
 
 from disinfo.utils import ease
@@ -135,6 +138,46 @@ def find_sequences(s: str) -> set:      # noqa: E501
 
     return result
 
+# Flags of the time pattern index, next to the digit bits 0-9.
+HOUR_IS_MINUTE = 1 << 10
+HOUR_IS_SECOND = 1 << 11
+MINUTE_IS_SECOND = 1 << 12
+
+@cache
+def _time_patterns() -> np.ndarray:
+    '''
+    Pattern of every second of the day: bit d is set when digit d is
+    highlighted by `find_sequences`, and the flags tell which of the hour,
+    minute and second are equal.
+    '''
+    index = np.zeros(24 * 60 * 60, dtype=np.uint16)
+    # The sequences only depend on the equal parts, or else on the set of
+    # digits, so most seconds share their result with an earlier one.
+    seen = {}
+    for h, m, s in itertools.product(range(24), range(60), range(60)):
+        time_str = f'{h:02d}:{m:02d}:{s:02d}'
+        key = (h == m, h == s, m == s, time_str[:2] if h in (m, s) else '', time_str[3:5] if m == s else '')
+        if not any(key):
+            key = frozenset(time_str)
+        if key not in seen:
+            seen[key] = sum(1 << d for d in find_sequences(time_str))
+        bits = seen[key]
+        bits |= HOUR_IS_MINUTE * (h == m) | HOUR_IS_SECOND * (h == s) | MINUTE_IS_SECOND * (m == s)
+        index[h * 3600 + m * 60 + s] = bits
+    return index
+
+def time_pattern(t) -> int:
+    '''Bits of the time pattern at `t`, see `_time_patterns`.'''
+    return int(_time_patterns()[t.hour * 3600 + t.minute * 60 + t.second])
+
+@cache
+def _pattern_digits(bits: int) -> frozenset:
+    return frozenset(d for d in range(10) if bits & (1 << d))
+
+def sequence_digits(t) -> frozenset:
+    '''Same as `find_sequences` on the HH:MM:SS of `t`.'''
+    return _pattern_digits(time_pattern(t) & 0x3FF)
+
 def digital_clock(fs: FrameState, seconds=True):
     t = fs.now
     hhmm = hstack([
@@ -183,8 +226,7 @@ def flip_info(fs: FrameState, seconds=True, align='right'):
 
 def flip_digital_clock(fs: FrameState, seconds=True, align='right'):
     t = fs.now
-    time_str = t.strftime('%H:%M:%S')
-    sequence_chars = find_sequences(time_str)
+    sequence_chars = sequence_digits(t)
     
     bg = "#5E5E5E4E"  # Default background
 
@@ -1,12 +1,11 @@
 import io
-import time
 import pendulum
 
 from functools import cache
-from typing import Optional
 
 from ..utils.drawer import draw_loop
-from ..drat.app_states import RuntimeStateManager
+from ..drat.app_states import RuntimeStateManager, PubSubStateManager, PubSubMessage
+from ..drat.printers import PrinterState, PrinterStates
 from ..components.text import Text, TextStyle, text
 from ..components.elements import StillImage, Frame
 from ..components.layouts import vstack, hstack
@@ -16,9 +15,8 @@ from ..components.spriteim import SpriteIcon
 from ..components.widget import Widget
 from ..components.transitions import text_slide_in
 from ..components import fonts
-from ..config import app_config
-from ..data_structures import FrameState, AppBaseModel
-from disinfo.utils.hass import HaWS
+from ..data_structures import FrameState
+from ..redis import get_dict
 from disinfo.utils.imops import image_from_url
 
 
@@ -35,115 +33,30 @@ tail_arrow_left         = text(f'⤙', style=tail_arrow_style)
 tail_arrow_right        = text(f'⤚', style=tail_arrow_style)
 text_percent_sign       = Text('%', style=TextStyle(font=fonts.tamzen__rs, color='#888888'))
 
+# Seconds between two camera snapshots.
+CAMERA_REFRESH = 6
+
 widget_style = DivStyle(padding=3, radius=3, background="#0455233D", border=1, border_color="#00000088")
 
-class PrinterState(AppBaseModel):
-    printer_id: str
-
-    bed_temp: Optional[float] = None
-    extruder_temp: Optional[float] = None
-    progress: Optional[float] = None
-    state: Optional[str] = None
-    current_stage: Optional[str] = None
-    filename: Optional[str] = None
-    thumbnail: Optional[str] = None
-    cover_image: Optional[str] = None
-    pick_image: Optional[str] = None
-
-    online: bool = False
-    is_definitely_online: bool = False
-    printer_name: str | None = None
-
-    eta: Optional[str] = None
-
-    completion_time: Optional[str] = ''
-    time_left: Optional[str] = ''
-    source_timezone: str = 'local'
-
-    is_on: bool = False
-    is_visible: bool = False
-    is_done: bool = False
-    is_printing: bool = False
-
-    _id: str = 'klipper'
-
-    def seconds_left(self, now: pendulum.DateTime) -> int:
-        if not self.eta:
-            return -1
-
-        eta = pendulum.parse(self.eta, tz=self.source_timezone).in_tz(tz='local')
-        return (eta - now).total_seconds()
-
-
-def get_moonraker_state(printer_id: str):
-    cam = HaWS().get_entity(f'camera.{printer_id}_libcamera')
-    cachebuster = int(time.time() // 7)
-    ignored_states = ['unknown', 'unavailable']
-    thumburl = (app_config.ha_base_url + cam.attributes.get('entity_picture', '') + f'&t={cachebuster}') if cam else None
-    get_sensor = lambda sensor: x.state if (x := HaWS().get_entity(f'sensor.{printer_id}_{sensor}')) and x.state not in ignored_states else None
-
-    state = PrinterState(
-        printer_id=printer_id,
-        bed_temp=float(get_sensor('bed_temperature') or '-42'),
-        extruder_temp=float(get_sensor('nozzle_temperature') or '-42'),
-        progress=int(float(get_sensor('progress') or '0')),
-        state=get_sensor('current_print_state'),
-        filename=get_sensor('filename'),
-        thumbnail=thumburl,
-        online=True,
-        is_on=get_sensor('printer_state') not in ('offline', 'unknown'),
-        is_printing=get_sensor('printer_state') in ('printing', 'pause', 'running'),
-        is_done=get_sensor('printer_state') == 'finish',
-        completion_time=pendulum.parse(x).strftime('%H:%M') if (x := get_sensor('print_eta')) else None,
-        time_left=get_sensor('print_time_left'),
-        eta=get_sensor('print_eta'),
-        printer_name=printer_id,
-    )
-    state.is_visible=get_sensor('printer_state') not in ('offline', 'unknown') and state.state is not None,
-    return state
-
-def get_bambulab_state(printer_id: str):
-    cam = HaWS().get_entity(f'camera.{printer_id}_camera')
-    cover = HaWS().get_entity(f'image.{printer_id}_cover_image')
-    pick_img = HaWS().get_entity(f'image.{printer_id}_pick_image')
-    cachebuster = int(time.time() // 6)
-    thumburl = (app_config.ha_base_url + cam.attributes.get('entity_picture', '') + f'&t={cachebuster}') if cam else None
-    coverurl = (app_config.ha_base_url + cover.attributes.get('entity_picture', '') + f'&t={cachebuster}') if cover else None
-    pickurl = (app_config.ha_base_url + pick_img.attributes.get('entity_picture', '') + f'&t={cachebuster}') if pick_img else None
-    get_sensor = lambda sensor: x.state if (x := HaWS().get_entity(f'sensor.{printer_id}_{sensor}')) and x.state != 'unavailable' else None
-
-    state = PrinterState(
-        printer_id=printer_id,
-        bed_temp=float(get_sensor('bed_temperature') or '-42'),
-        extruder_temp=float(get_sensor('nozzle_temperature') or '-42'),
-        progress=int(get_sensor('print_progress') or '0'),
-        state=get_sensor('print_status'),
-        filename=get_sensor('task_name'),
-        thumbnail=thumburl,
-        online=True,
-        is_on=get_sensor('print_status') not in ('offline', 'unknown'),
-        is_printing=get_sensor('print_status') in ('printing', 'pause', 'running'),
-        is_done=get_sensor('print_status') == 'finish',
-        completion_time=pendulum.parse(x).strftime('%H:%M') if (x := get_sensor('end_time')) else None,
-        time_left=get_sensor('remaining_time'),
-        eta=get_sensor('end_time'),
-        printer_name=get_sensor('printer_name'),
-        cover_image=coverurl,
-        pick_image=pickurl,
-        current_stage=get_sensor('current_stage'),
-    )
-    state.is_visible=get_sensor('print_status') not in ('offline', 'unknown') and state.state is not None,
-    return state
-
-def get_state():
-    printers = []
-    for printer in app_config.printer_ids:
-        model, printer_id = printer.split(':')
-        if model == 'bambu':
-            printers.append(get_bambulab_state(printer_id))
-        elif model == 'klipper':
-            printers.append(get_moonraker_state(printer_id))
-    return printers
+class PrinterStateManager(PubSubStateManager[PrinterStates]):
+    model = PrinterStates
+    channels = ('di.pubsub.printers',)
+
+    def initial_state(self) -> PrinterStates:
+        return self.load()
+
+    def load(self) -> PrinterStates:
+        if states := get_dict('printers.state'):
+            return PrinterStates(**states)
+        return PrinterStates()
+
+    def process_message(self, channel: str, data: PubSubMessage):
+        if data.action == 'update':
+            self.state = self.load()
+
+
+def get_state() -> list[PrinterState]:
+    return PrinterStateManager().get_state().printers
 
 
 def time_remaining(fs: FrameState, state: PrinterState) -> Frame:
@@ -215,7 +128,7 @@ def composer(fs: FrameState, state: PrinterState):
         text(state.current_stage),
         text(state.state),
     ]
-    bg = div(image_from_url(state.thumbnail, resize=(92, 92)), radius=3).tag(('klipper.thumb', state.printer_name))
+    bg = div(image_from_url(state.thumbnail, resize=(92, 92), refresh=CAMERA_REFRESH), radius=3).tag(('klipper.thumb', state.printer_name))
     # covimg = div(image_from_url(state.cover_image, resize=(42, 42)).crop_even(5, 10), radius=3, background="#cccccc3f").tag(('klipper.coverimg', state.printer_name))
     # pickimg = div(image_from_url(state.pick_image, resize=(42, 42)).crop_even(5, 10), radius=3, background="#cccccc3f").tag(('klipper.pickimg', state.printer_name))
 
@@ -1,25 +1,11 @@
-import requests
-import io
-
 from PIL import Image
-from functools import cache
 
-from disinfo import config
-from disinfo.components.elements import Frame, StillImage
+from disinfo.utils.remote_images import remote_image
 
 
+def _dither(img: Image.Image) -> Image.Image:
+    # Dithering helps
+    return img.resize((80, 80)).quantize()
 
-@cache
 def get_album_art(url: str, size: int = 16):
-    if not url:
-        return None
-    try:
-        r = requests.get(url)
-        r.raise_for_status()
-        fp = io.BytesIO(r.content)
-        img = Image.open(fp)
-        # Dithering helps
-        img = img.resize((80, 80)).quantize().resize((size, size)).convert('RGBA')
-        return Frame(img)
-    except requests.RequestException:
-        return None
+    return remote_image(url, size=(size, size), process=_dither)
@@ -1,9 +1,7 @@
-import requests
-import io
 import pendulum
 
 from PIL import Image
-from functools import cache
+from functools import lru_cache
 from datetime import timedelta
 
 from ..utils.drawer import draw_loop
@@ -16,11 +14,11 @@ from ..components.layers import div, DivStyle
 from ..components.transitions import SlideIn
 from ..components.widget import Widget
 from ..components.scroller import HScroller
-from ..utils.func import throttle
+from ..utils.remote_images import remote_image
 from ..utils import ease
 from ..data_structures import FrameState
 
-from disinfo.utils.hass import get_entity
+from disinfo.utils.hass import get_entity, entity_version
 
 scroll_media_title = HScroller(size=20, delta=1, speed=0.03, pause_at_loop=True, pause_duration=1)
 scroll_artist_name = HScroller(size=20, delta=1, speed=0.05, pause_at_loop=True, pause_duration=1)
@@ -29,17 +27,17 @@ scroll_album_title = HScroller(size=20, delta=1, speed=0.05, pause_at_loop=True,
 play_icon = StillImage('assets/raster/play-5x5.png')
 pause_icon = StillImage('assets/raster/pause-5x5.png')
 spotify_icon = StillImage('assets/raster/spotify-5x5.png')
+franceinfo_art = StillImage('assets/raster/france-info.png')
 
 text_media_title = Text(style=TextStyle(font=fonts.bitocra7, color='#0E8E47'))
 text_artist_name = Text(style=TextStyle(font=fonts.bitocra7, color='#a1a9b0'))
 text_album_title = Text(style=TextStyle(font=fonts.bitocra7, color='#a1a9b0'))
 
 
-@throttle(1033)
-def get_state():
+@lru_cache(maxsize=1)
+def _speaker_state(version: int) -> dict:
+    # Recomputed only when the speaker entity changes.
     state = {}
-    state['is_visible'] = False
-
     s = get_entity(app_config.speaker_entity)
 
     if not s:
@@ -49,48 +47,60 @@ def get_state():
 
     state['playing'] = s['state'] == 'playing'
     state['paused'] = s['state'] == 'paused'
-
-    last_updated = s['last_updated']
-    now = pendulum.now()
+    state['last_updated'] = s['last_updated']
 
     state['media_title'] = s['attributes'].get('media_title', '')
     state['media_album'] = s['attributes'].get('media_album_name', '')
     state['media_artist'] = s['attributes'].get('media_artist', '')
     state['is_spotify'] = 'Spotify' in s['attributes'].get('source', '')
+    state['entity_picture'] = s['attributes'].get('entity_picture')
+    return state
+
+def get_state():
+    speaker = _speaker_state(entity_version(app_config.speaker_entity))
+    if not speaker:
+        return {'is_visible': False}
+
+    state = dict(speaker)
+
+    # The art is looked up on each call, it shows up once it is fetched.
     state['album_art'] = get_album_art(
-        s['attributes'].get('entity_picture'),
+        state['entity_picture'],
         media_album=state['media_album'],
         is_spotify=state['is_spotify'])
 
     timeout_delay = 40 if state['playing'] else 2
+    now = pendulum.now()
 
     state['is_visible'] = all([
         state['playing'] or state['paused'],
         state['media_title'] != 'TV',
-        (last_updated + timedelta(minutes=timeout_delay)) > now,
+        (state['last_updated'] + timedelta(minutes=timeout_delay)) > now,
     ])
 
     return state
 
-@cache
+def _prescale(img: Image.Image) -> Image.Image:
+    # Dithering helps? .quantize()
+    return img.resize((80, 80))
+
+@lru_cache(maxsize=8)
+def _album_frame(art: Frame, is_spotify: bool):
+    frame = art.trim(3, 5, 3, 5)
+    if is_spotify:
+        return composite_at(spotify_icon, frame, 'bl')
+    return frame
+
 def get_album_art(fragment: str, media_album: str, is_spotify: bool=False):
     if not fragment:
         return None
     if media_album and 'franceinfo' in media_album:
         # Hard code some album arts.
-        return StillImage('assets/raster/france-info.png')
-    try:
-        r = requests.get(f'http://{app_config.ha_base_url}{fragment}')
-        r.raise_for_status()
-        fp = io.BytesIO(r.content)
-        img = Image.open(fp)
-        # Dithering helps? .quantize()
-        frame = Frame(img.resize((80, 80)).resize((25, 25)).convert('RGBA')).trim(3, 5, 3, 5)
-        if is_spotify:
-            return composite_at(spotify_icon, frame, 'bl')
-        return frame
-    except requests.RequestException:
-        return StillImage('assets/raster/france-info.png').trim(3, 5, 3, 5)
+        return franceinfo_art
+    art = remote_image(f'http://{app_config.ha_base_url}{fragment}', size=(25, 25), process=_prescale)
+    if art is None:
+        return None
+    return _album_frame(art, is_spotify)
 
 
 def composer(fs: FrameState):
@@ -1,11 +1,12 @@
+import itertools
 import math
 import pendulum
 import numpy as np
 import cairocffi as cairo
 
 from PIL import Image
-from suncalc import get_position, get_times
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
 from disinfo.data_structures import FrameState
@@ -18,9 +19,11 @@ from disinfo.components import fonts
 from disinfo.screens.colors import SkyHues
 from disinfo.config import app_config
 from disinfo.utils.func import throttle
-from disinfo.utils.cairo import to_pil
+from disinfo.utils.cairo import pooled_surface, to_pil
 from disinfo.utils.color import AppColor
 
+from .ephemeris import SolarDay, ephemeris, time_to_angle
+
 
 s_time_tick = [
     TextStyle(font=fonts.bitocra7, color=SkyHues.label),
@@ -73,55 +76,38 @@ class AnalogClockStyle:
 
 
 
-@throttle(200)
-def apply_noise(img: Image.Image, noise: float = 0.1):
-    pat = np.random.rand(img.height, img.width) * noise
-    alpha = np.ones_like(pat)
-    pat = np.stack([pat, pat, pat, alpha], axis=2)
-    img_arr = np.array(img) / 255
-    img_arr = np.clip(img_arr + pat, 0, 1)
-    return Image.fromarray(np.uint8(img_arr * 255))
-
+@lru_cache(maxsize=4)
+def _noise_tile(noise: float, height: int, width: int) -> np.ndarray:
+    '''
+    Grain levels from 0 to `noise` of full scale, twice the image size in
+    each direction so that any window at an offset below the size fits.
+    '''
+    levels = noise * 255 + 1
+    return (np.random.rand(height * 2, width * 2) * levels).astype(np.uint8)
 
-def deg_to_rad(deg):
-    return deg * (math.pi / 180) % (2 * math.pi)
-
-def rad_to_deg(rad):
-    return rad * (180 / math.pi) % 360
+_noise_offsets = itertools.count()
 
+@throttle(200, key=lambda img, noise=0.1: (img, noise))
+def apply_noise(img: Image.Image, noise: float = 0.1):
+    tile = _noise_tile(noise, img.height, img.width)
+    n = next(_noise_offsets)
+    oy = (n * 37) % img.height
+    ox = (n * 61) % img.width
+    grain = tile[oy:oy + img.height, ox:ox + img.width, None]
 
-def time_to_angle(t):
-    # Returns the angle of the current time in radians.
+    arr = np.array(img.convert('RGBA'))
+    # Saturating add, the sum can not overflow past 255.
+    arr[..., :3] = np.minimum(arr[..., :3], 255 - grain) + grain
+    arr[..., 3] = 255
+    return Image.fromarray(arr)
 
-    # 12:00 is 0 degrees
-    # 24 hours = 24 * 60 * 60 = 86400 seconds
-    phase = 90
-    period = 60 * 60 * 24
-    elapsed = t.hour * 60 * 60 + t.minute * 60 + t.second
-    return deg_to_rad((((elapsed / period) * 360) + phase) % 360)
 
 def clamp(value, min_value=0, max_value=1):
     return max(min(value, max_value), min_value)
 
-def sun_times(t):
-    times = get_times(t.in_tz('UTC'), app_config.longitude, app_config.latitude)
-    position = get_position(t.in_tz('UTC'), app_config.longitude, app_config.latitude)
-    utctimes = {k: pendulum.instance(v).in_tz('local') for k, v in times.items() if not str(v) == 'NaT'}
-    angles = {k: time_to_angle(v.time()) for k, v in utctimes.items()}
-    return angles, utctimes, position
-
-def analog_clock(fs, style: AnalogClockStyle):
-    t = fs.now
+def _geometry(style: AnalogClockStyle):
     w = style.width
     h = style.height
-
-    # t = pendulum.now().set(hour=17, minute=00, month=1)
-    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
-    surface_sun = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
-
-    theta = time_to_angle(t.time())
-    solar_angles, solar_times, solar_pos = sun_times(t)
-
     cx = w / 2 if not style.cx else style.cx
     cy = h / 2 if not style.cy else style.cy
     hyp = math.sqrt(cx ** 2 + cy ** 2)
@@ -130,8 +116,20 @@ def analog_clock(fs, style: AnalogClockStyle):
     rcontain = min(cx, cy)
 
     sun_path_radius = rcontain * style.dial_radius_multiplier
-    sun_radius = 2
-
+    return w, h, cx, cy, hyp, rcontain, sun_path_radius
+
+@lru_cache(maxsize=2)
+def _dial(style: AnalogClockStyle, day: SolarDay, minute: int) -> Image.Image:
+    '''
+    Sky, twilight sections and hour ticks. They only change with the sun's
+    position, so this is drawn once per minute.
+    '''
+    w, h, cx, cy, hyp, rcontain, sun_path_radius = _geometry(style)
+    surface = pooled_surface(w, h, 'solar.dial')
+    solar_angles = day.angles
+    solar_pos = {'altitude': day.altitude[minute]}
+
+    theta = time_to_angle(day.start.add(minutes=minute).time())
     sun_x = cx + sun_path_radius * math.cos(theta)
     sun_y = cy + sun_path_radius * math.sin(theta)
 
@@ -230,6 +228,50 @@ def analog_clock(fs, style: AnalogClockStyle):
     ctx.rectangle(0, 0, w, h)
     ctx.fill()
 
+    return to_pil(surface)
+
+@lru_cache(maxsize=2)
+def _dial_labels(style: AnalogClockStyle, day: SolarDay) -> Image.Image:
+    w, h, cx, cy, hyp, rcontain, sun_path_radius = _geometry(style)
+    solar_angles = day.angles
+    solar_times = day.times
+    tick_radius = rcontain * style.tick_radius_multiplier
+
+    i = Image.new('RGBA', (w, h), (0, 0, 0, 0))
+
+    label_radius = tick_radius + 8
+
+    time_ticks = [0, 6, 12, 18]
+    for hour in time_ticks:
+        time = pendulum.time(hour=hour)
+        theta = time_to_angle(time)
+        label = time.format('HH')
+        lx = round(cx + label_radius * math.cos(theta))
+        ly = round(cy + label_radius * math.sin(theta))
+
+        is_day = theta < solar_angles['sunset'] or theta > solar_angles['sunrise']
+        place_at(text(label, s_time_tick[is_day]), i, lx, ly, anchor='mm')
+
+    # Place sunset time
+    sunset = solar_times['sunset']
+    sunset_theta = time_to_angle(sunset.time())
+    sunset_radius = min(rcontain / math.sin(sunset_theta) - 5, rcontain / math.cos(2 * math.pi - sunset_theta))
+    sunset_label = sunset.format('HH:mm')
+    sunset_x = round(cx + sunset_radius * math.cos(sunset_theta))
+    sunset_y = round(cy + sunset_radius * math.sin(sunset_theta))
+    place_at(text(sunset_label, s_time_tick[0]), i, sunset_x, sunset_y, anchor='ml')
+
+    return i
+
+def _sun(style: AnalogClockStyle, day: SolarDay, theta: float) -> Image.Image:
+    w, h, cx, cy, hyp, rcontain, sun_path_radius = _geometry(style)
+    surface_sun = pooled_surface(w, h, 'solar.sun')
+    solar_angles = day.angles
+    sun_radius = 2
+
+    sun_x = cx + sun_path_radius * math.cos(theta)
+    sun_y = cy + sun_path_radius * math.sin(theta)
+
     ctx = cairo.Context(surface_sun)
 
     # Needle
@@ -322,34 +364,17 @@ def analog_clock(fs, style: AnalogClockStyle):
     ctx.stroke()
     ctx.reset_clip()
 
+    return to_pil(surface_sun)
 
-    i = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-
-    i.alpha_composite(apply_noise(to_pil(surface), 0.003), (0, 0))
-
-    label_radius = tick_radius + 8
-
-    time_ticks = [0, 6, 12, 18]
-    for hour in time_ticks:
-        time = pendulum.time(hour=hour)
-        theta = time_to_angle(time)
-        label = time.format('HH')
-        lx = round(cx + label_radius * math.cos(theta))
-        ly = round(cy + label_radius * math.sin(theta))
-
-        is_day = theta < solar_angles['sunset'] or theta > solar_angles['sunrise']
-        place_at(text(label, s_time_tick[is_day]), i, lx, ly, anchor='mm')
-
-    # Place sunset time
-    sunset = solar_times['sunset']
-    sunset_theta = time_to_angle(sunset.time())
-    sunset_radius = min(rcontain / math.sin(sunset_theta) - 5, rcontain / math.cos(2 * math.pi - sunset_theta))
-    sunset_label = sunset.format('HH:mm')
-    sunset_x = round(cx + sunset_radius * math.cos(sunset_theta))
-    sunset_y = round(cy + sunset_radius * math.sin(sunset_theta))
-    place_at(text(sunset_label, s_time_tick[0]), i, sunset_x, sunset_y, anchor='ml')
+def analog_clock(fs, style: AnalogClockStyle):
+    t = fs.now
+    day = ephemeris(t)
 
-    i.alpha_composite(to_pil(surface_sun), (0, 0))
+    # t = pendulum.now().set(hour=17, minute=00, month=1)
+    i = Image.new('RGBA', (style.width, style.height), (0, 0, 0, 0))
+    i.alpha_composite(apply_noise(_dial(style, day, day.minute(t)), 0.003), (0, 0))
+    i.alpha_composite(_dial_labels(style, day), (0, 0))
+    i.alpha_composite(_sun(style, day, time_to_angle(t.time())), (0, 0))
 
     return Frame(i)
 
@@ -0,0 +1,65 @@
+'''
+Sun event times and positions for the solar clock.
+
+Event times change once a day and the sun's altitude only slightly within
+a minute, so they are computed once per day and location: the events with
+`get_times`, and the altitude at every minute of the day with a single
+vectorized `get_position` call.
+'''
+import math
+import numpy as np
+import pendulum
+
+from dataclasses import dataclass
+from functools import lru_cache
+from suncalc import get_position, get_times
+
+from disinfo.config import app_config
+
+
+def deg_to_rad(deg):
+    return deg * (math.pi / 180) % (2 * math.pi)
+
+
+def time_to_angle(t):
+    # Returns the angle of the current time in radians.
+
+    # 12:00 is 0 degrees
+    # 24 hours = 24 * 60 * 60 = 86400 seconds
+    phase = 90
+    period = 60 * 60 * 24
+    elapsed = t.hour * 60 * 60 + t.minute * 60 + t.second
+    return deg_to_rad((((elapsed / period) * 360) + phase) % 360)
+
+
+@dataclass(frozen=True, eq=False)
+class SolarDay:
+    start: pendulum.DateTime
+    times: dict[str, pendulum.DateTime]
+    angles: dict[str, float]
+    # Sun altitude (radians) at each minute since `start`.
+    altitude: np.ndarray
+
+    def minute(self, t: pendulum.DateTime) -> int:
+        m = int((t.timestamp() - self.start.timestamp()) // 60)
+        return max(0, min(m, len(self.altitude) - 1))
+
+
+@lru_cache(maxsize=2)
+def solar_day(date: pendulum.Date, latitude: float, longitude: float) -> SolarDay:
+    start = pendulum.datetime(date.year, date.month, date.day, tz='local')
+    noon = start.add(hours=12)
+
+    times = get_times(noon.in_tz('UTC'), longitude, latitude)
+    times = {k: pendulum.instance(v).in_tz('local') for k, v in times.items() if not str(v) == 'NaT'}
+    angles = {k: time_to_angle(v.time()) for k, v in times.items()}
+
+    # Days are not always 1440 minutes long, with DST changes.
+    minutes = int((start.add(days=1) - start).total_seconds() // 60)
+    stamps = np.datetime64(int(start.timestamp()), 's') + np.arange(minutes) * np.timedelta64(60, 's')
+    altitude = np.asarray(get_position(stamps, longitude, latitude)['altitude'], dtype=float)
+
+    return SolarDay(start, times, angles, altitude)
+
+def ephemeris(t: pendulum.DateTime) -> SolarDay:
+    return solar_day(t.in_tz('local').date(), app_config.latitude, app_config.longitude)
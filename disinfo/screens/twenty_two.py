@@ -14,6 +14,7 @@ from ..components.spriteim import SpriteIcon
 from ..data_structures import FrameState
 from ..drat.app_states import RuntimeStateManager
 from ..config import app_config
+from .date_time import time_pattern, HOUR_IS_MINUTE, MINUTE_IS_SECOND
 
 
 nyan_gif = SpriteIcon('assets/raster/nyan-cat2.gif', step_time=0.1, resize=(42, 42))
@@ -57,9 +58,10 @@ next_pos = _gen_path()
 def composer(fs: FrameState):
     t = fs.now #.set(hour=21, minute=21, second=2)
 
-    equal_elements = t.hour == t.minute
-    twentytwo = t.hour == t.minute == 22
-    all_equal = t.hour == t.minute == t.second
+    pattern = time_pattern(t)
+    equal_elements = bool(pattern & HOUR_IS_MINUTE)
+    twentytwo = equal_elements and t.hour == 22
+    all_equal = equal_elements and bool(pattern & MINUTE_IS_SECOND)
 
     if RuntimeStateManager().get_state(fs).show_twentytwo:
         equal_elements = True
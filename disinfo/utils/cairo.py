@@ -1,14 +1,52 @@
-from functools import cache
+import hashlib
+import os
 
-from cairocffi import ImageSurface, FORMAT_RGB24, FORMAT_ARGB32
+from contextlib import suppress
+from functools import lru_cache
+from pathlib import Path
+
+from cairocffi import Context, ImageSurface, FORMAT_RGB24, FORMAT_ARGB32, OPERATOR_CLEAR
 from cairosvg.parser import Tree
 from cairosvg.surface import PNGSurface
+from lru import LRU
 from PIL import Image
 
 from disinfo.components.elements import Frame
 from disinfo.components.layers import styled_div
+from disinfo.config import app_config
+
+_surfaces = LRU(16)
+
+def pooled_surface(width: int, height: int, slot: str = '') -> ImageSurface:
+    '''
+    ARGB32 surface of the given size, reused across calls and cleared to
+    transparent each time.
+
+    There is one surface per (width, height, slot), so it must be converted
+    with `to_pil` before the next call with the same arguments. Use distinct
+    slots for surfaces that are drawn at the same time.
+    '''
+    key = (width, height, slot)
+    surface = _surfaces.get(key)
+    if surface is None:
+        surface = ImageSurface(FORMAT_ARGB32, width, height)
+        _surfaces[key] = surface
+        return surface
+    ctx = Context(surface)
+    ctx.set_operator(OPERATOR_CLEAR)
+    ctx.paint()
+    return surface
 
 def to_pil(surface: ImageSurface) -> Image.Image:
+    '''
+    Copies the surface into a new image, the buffer is swizzled and
+    unpremultiplied by Pillow's unpacker in one pass.
+
+    The unpacker reads cairo's buffer in place, which is the only copy made.
+    Pooled surfaces are cleared on their next use, so the result must not
+    share their memory anyway.
+    '''
+    surface.flush()
     format = surface.get_format()
     size = (surface.get_width(), surface.get_height())
     stride = surface.get_stride()
@@ -25,18 +63,67 @@ def to_pil(surface: ImageSurface) -> Image.Image:
     else:
         raise NotImplementedError(repr(format))
 
+_rasters = LRU(512)
+# Rasters kept on disk, the least recently used are removed beyond that.
+DISK_ENTRIES = 2048
+_writes = 0
+
+def _prune(directory: Path):
+    try:
+        files = sorted(directory.glob('*.png'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for path in files[DISK_ENTRIES:]:
+            path.unlink(missing_ok=True)
+    except OSError as e:
+        print('[e] raster cache', e)
+
+def rasterize_svg(svg: bytes, scale: float = 1) -> Image.Image:
+    '''
+    Renders the SVG with cairosvg, cached by its content and scale.
+
+    Rasters are kept in a bounded in-memory cache, and as PNGs in
+    `raster_cache_dir` so that they stay warm across restarts. The disk
+    cache keeps the `DISK_ENTRIES` most recently used rasters.
+    The returned image is shared, do not modify it.
+    '''
+    global _writes
+    key = hashlib.sha1(b'%r:' % scale + svg).hexdigest()
+    if (img := _rasters.get(key)) is not None:
+        return img
+
+    path = Path(app_config.raster_cache_dir) / f'{key}.png'
+    try:
+        with Image.open(path) as f:
+            img = f.convert('RGBA')
+        with suppress(OSError):
+            # Marks it as used, for the pruning.
+            os.utime(path)
+    except (OSError, ValueError):
+        surface = PNGSurface(Tree(bytestring=svg), None, 1, scale=scale).cairo
+        img = to_pil(surface)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+            img.save(tmp, format='PNG')
+            os.replace(tmp, path)
+            _writes += 1
+            if _writes % 64 == 0:
+                _prune(path.parent)
+        except OSError as e:
+            print('[e] raster cache', e)
+
+    _rasters[key] = img
+    return img
+
 def load_svg(path: str, scale: float = 1) -> Frame:
     with open(path, 'rb') as f:
         svg = f.read()
-    surface = PNGSurface(Tree(bytestring=svg), None, 1, scale=scale).cairo
-    return Frame(to_pil(surface), hash=path)
+    return Frame(rasterize_svg(svg, scale), hash=path)
 
-@cache
 def load_svg_string(svg: str) -> Frame:
-    surface = PNGSurface(Tree(bytestring=svg.encode()), None, 1).cairo
-    return Frame(to_pil(surface), hash=svg)
+    return Frame(rasterize_svg(svg.encode()), hash=svg)
 
 
+@lru_cache(maxsize=256)
 def render_emoji(text: str, size: int = 14):
     fontsize = size * 0.8
     w = size * 1
@@ -1,21 +1,27 @@
 import inspect
 import time
 from pathlib import Path
+from typing import Any, Callable, Optional
 
 
-def throttle(duration: int):
+def throttle(duration: int, key: Optional[Callable[..., Any]] = None):
     '''Throttles the execution of the decorated function.
     - duration: (milliseconds) during which func is cached.
+    - key: optional, called with the same arguments. The cached value is
+      only returned while the key is equal to the one it was made with.
     '''
     def decorator(func):
         last_called_at = 0
         duration_sec = duration / 1000.0
         last_value = None
+        last_key = None
         def wrapper(*args, **kwargs):
-            nonlocal last_called_at, last_value
-            if last_called_at and (time.monotonic() - last_called_at) < duration_sec:
+            nonlocal last_called_at, last_value, last_key
+            k = key(*args, **kwargs) if key else None
+            if last_called_at and (time.monotonic() - last_called_at) < duration_sec and k == last_key:
                 return last_value
             last_value = func(*args, **kwargs)
+            last_key = k
             last_called_at = time.monotonic()
             return last_value
         return wrapper
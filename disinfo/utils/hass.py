@@ -1,3 +1,4 @@
+import bisect
 import websocket
 import json
 import time
@@ -5,6 +6,8 @@ import threading
 import re
 
 from datetime import datetime
+from typing import Callable
+from pydantic import ValidationError
 from pydantic.dataclasses import dataclass
 
 from disinfo.config import app_config
@@ -66,7 +69,24 @@ class Msg(AppBaseModel):
     event: EventData | None = None
 
 
+# The first entity_id of a state_changed event is the one that changed.
+_EVENT_ENTITY_ID = re.compile(r'"entity_id"\s*:\s*"([^"]+)"')
+
+
 class HaWSClient(metaclass=UniqInstance):
+    '''
+    Keeps a copy of the HA states.
+
+    Only the entities the dashboard reads are validated as they arrive: the
+    ones from the config, and those asked for with `entity`, `grep` or
+    `prefixed`. The others are kept as received, a state from `get_states`
+    or the raw `state_changed` message, and validated when they are first
+    asked for.
+
+    Each update of an entity bumps its version, so that derived state can be
+    cached on the versions of the entities it reads, and calls the watchers
+    of its prefix.
+    '''
     def __init__(self):
         self.connected = False
         self.connecting = False
@@ -77,14 +97,142 @@ class HaWSClient(metaclass=UniqInstance):
         self._mid = 42
         self.host = app_config.ha_websocket_url
         self.db: dict[str, Entity] = {}
+        self.raw: dict[str, dict | str] = {}
+        self.interest: set[str] = {
+            *app_config.presence_sensors,
+            app_config.speaker_entity,
+            app_config.weather_entity,
+        }
+        self.interest_patterns: dict[str, re.Pattern] = {}
+        self.interest_prefixes: tuple[str, ...] = ()
+        # Every entity id received, sorted for the prefix lookups.
+        self.ids: list[str] = []
+        self.known: set[str] = set()
+        self.pattern_ids: dict[str, set[str]] = {}
+        self.versions: dict[str, int] = {}
+        self.watchers: list[tuple[str, Callable[[Entity], None]]] = []
+        # Reentrant, so that watchers can read the other entities.
+        self.lock = threading.RLock()
     
     def _counter(self) -> int:
         x = self._mid
         self._mid += 1
         return x
     
-    def on_message(self, ws, msg):
-        msg = Msg.model_validate_json(msg)
+    def _seen(self, entity_id: str):
+        # Called with the lock held, for every entity id received.
+        if entity_id in self.known:
+            return
+        self.known.add(entity_id)
+        bisect.insort(self.ids, entity_id)
+        for pattern, expr in self.interest_patterns.items():
+            if expr.match(entity_id):
+                self.pattern_ids[pattern].add(entity_id)
+                self.interest.add(entity_id)
+
+    def is_interesting(self, entity_id: str) -> bool:
+        if entity_id in self.interest:
+            return True
+        if entity_id.startswith(self.interest_prefixes):
+            self.interest.add(entity_id)
+            return True
+        return False
+
+    def _parse(self, raw: dict | str) -> Entity | None:
+        try:
+            if isinstance(raw, dict):
+                return Entity.model_validate(raw)
+            return Msg.model_validate_json(raw).event.data.new_state
+        except ValidationError as e:
+            print(f'Invalid entity from HA: {e}')
+            return None
+
+    def _store(self, entity_id: str, entity: Entity):
+        # Called with the lock held.
+        self.db[entity_id] = entity
+        self.versions[entity_id] = self.versions.get(entity_id, 0) + 1
+        for prefix, callback in self.watchers:
+            if entity_id.startswith(prefix):
+                try:
+                    callback(entity)
+                except Exception as e:
+                    print(f'Error in HA watcher of {prefix}: {e}')
+
+    def _validate_pending(self, entity_id: str):
+        # Called with the lock held.
+        if (raw := self.raw.pop(entity_id, None)) is None:
+            return
+        if entity := self._parse(raw):
+            self._store(entity_id, entity)
+
+    def entity(self, entity_id: str) -> Entity | None:
+        if entity_id in self.interest and entity_id not in self.raw:
+            return self.db.get(entity_id)
+        with self.lock:
+            self.interest.add(entity_id)
+            self._validate_pending(entity_id)
+        return self.db.get(entity_id)
+
+    def grep(self, pattern: str) -> list[Entity]:
+        if pattern not in self.interest_patterns:
+            expr = re.compile(pattern)
+            with self.lock:
+                self.interest_patterns[pattern] = expr
+                self.pattern_ids[pattern] = {k for k in self.ids if expr.match(k)}
+                for entity_id in self.pattern_ids[pattern]:
+                    self.interest.add(entity_id)
+                    self._validate_pending(entity_id)
+        return [self.db[k] for k in sorted(self.pattern_ids[pattern]) if k in self.db]
+
+    def prefixed(self, prefix: str) -> list[str]:
+        '''Ids of the entities starting with `prefix`, a domain like `sensor.` for instance.'''
+        if prefix not in self.interest_prefixes:
+            with self.lock:
+                self.interest_prefixes += (prefix,)
+                for entity_id in self._range(prefix):
+                    self.interest.add(entity_id)
+                    self._validate_pending(entity_id)
+        return self._range(prefix)
+
+    def _range(self, prefix: str) -> list[str]:
+        lo = bisect.bisect_left(self.ids, prefix)
+        hi = bisect.bisect_left(self.ids, prefix + '\U0010ffff', lo)
+        return self.ids[lo:hi]
+
+    def version(self, entity_id: str) -> int:
+        '''Number of times the entity was updated, it changes with every new state.'''
+        self.entity(entity_id)
+        return self.versions.get(entity_id, 0)
+
+    def watch(self, prefix: str, callback: Callable[[Entity], None]):
+        '''
+        Calls `callback(entity)` with the new state of every entity whose id
+        starts with `prefix`, from the websocket thread.
+        '''
+        self.prefixed(prefix)
+        with self.lock:
+            self.watchers.append((prefix, callback))
+
+    def on_message(self, ws, msg: str):
+        if '"state_changed"' in msg and (m := _EVENT_ENTITY_ID.search(msg)):
+            with self.lock:
+                self._seen(m[1])
+                if not self.is_interesting(m[1]):
+                    self.raw[m[1]] = msg
+                    return
+
+        data = json.loads(msg)
+        if isinstance(data.get('result'), list):
+            with self.lock:
+                for state in data['result']:
+                    entity_id = state.get('entity_id')
+                    self._seen(entity_id)
+                    self.raw[entity_id] = state
+                    if self.is_interesting(entity_id):
+                        self._validate_pending(entity_id)
+            return
+
+        msg = Msg.model_validate(data)
 
         match msg:
             case Msg(type="auth_required"):
@@ -92,12 +240,12 @@ class HaWSClient(metaclass=UniqInstance):
             case Msg(type="auth_ok"):
                 self.send("subscribe_events", id=self._counter(), event_type="state_changed")
                 self.send("get_states", id=self._counter())
-            case Msg(result=[*entities]):
-                for entity in entities:
-                    self.db[entity.entity_id] = entity
             case Msg(event=event) if event and event.event_type == "state_changed":
                 if new_state := event.data.new_state:
-                    self.db[event.data.entity_id] = new_state
+                    with self.lock:
+                        # Newer than anything still pending.
+                        self.raw.pop(event.data.entity_id, None)
+                        self._store(event.data.entity_id, new_state)
             case Msg(result=ResponseResult(response=response)) if isinstance(response, dict):
                 for uid, data in response.items():
                     if uid in self.db:
@@ -161,16 +309,16 @@ class HaWS(metaclass=UniqInstance):
         self.client.connect()
     
     def get_entity(self, entity_id: str) -> Entity | None:
-        try:
-            return self.client.db[entity_id]
-        except KeyError:
-            # print(f'Entity {entity_id} not found in HA database.')
-            return None
+        return self.client.entity(entity_id)
     
     def grep_entities(self, pattern: str) -> list[Entity]:
-        expr = re.compile(pattern)
-        keys = [k for k in self.client.db if expr.match(k)]
-        return [self.client.db[k] for k in keys]
+        return self.client.grep(pattern)
+
+    def version(self, entity_id: str) -> int:
+        return self.client.version(entity_id)
+
+    def watch(self, prefix: str, callback: Callable[[Entity], None]):
+        self.client.watch(prefix, callback)
     
     def call_service(self, name: str, **kwargs) -> bool:
         domain, service = name.split('.')
@@ -182,3 +330,6 @@ def get_entity(entity_id: str) -> Entity | None:
 
 def get_entities(pattern: str) -> list[Entity]:
     return HaWS().grep_entities(pattern)
+
+def entity_version(entity_id: str) -> int:
+    return HaWS().version(entity_id)
@@ -1,11 +1,12 @@
-import io
-import requests
+import math
 import numpy as np
 
 from functools import lru_cache
-from PIL import Image, ImageDraw, ImageEnhance
+from lru import LRU
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
 
 from disinfo.components.elements import Frame, StillImage
+from disinfo.utils.remote_images import remote_image
 
 
 def enlarge_pixels(img: Image.Image, scale: int = 4, gap: int = 1, outline_color: str = '#000000'):
@@ -67,41 +68,120 @@ def apply_gamma(img: Image.Image, g):
     return Image.fromarray((im * 255).astype(np.uint8))
 
 
-def find_coeffs(pa, pb):
+def _quantize_pts(pts, precision: int = 2) -> tuple[tuple[float, float], ...]:
+    return tuple((round(float(x), precision), round(float(y), precision)) for x, y in pts)
+
+@lru_cache(maxsize=1024)
+def _solve_coeffs(pa: tuple, pb: tuple) -> tuple[float, ...]:
     # https://stackoverflow.com/a/14178717
+    # Four point pairs give a square 8x8 system, so solve it directly instead
+    # of going through the normal equations.
     matrix = []
     for p1, p2 in zip(pa, pb):
         matrix.append([p1[0], p1[1], 1, 0, 0, 0, -p2[0]*p1[0], -p2[0]*p1[1]])
         matrix.append([0, 0, 0, p1[0], p1[1], 1, -p2[1]*p1[0], -p2[1]*p1[1]])
 
-    A = np.matrix(matrix, dtype=np.float64)
-    B = np.array(pb).reshape(8)
-
-    res = np.dot(np.linalg.inv(A.T * A) * A.T, B)
-    return np.array(res).reshape(8)
-
-def perspective_transform(img: Image.Image, src_pts, dst_pts):
-    coeffs = find_coeffs(dst_pts, src_pts)
-    return img.transform((img.width, img.height), Image.PERSPECTIVE, coeffs, Image.BICUBIC)
-
-
+    A = np.array(matrix, dtype=np.float64)
+    B = np.array(pb, dtype=np.float64).reshape(8)
 
-@lru_cache(maxsize=256)
-def _fetch_image(url: str) -> bytes:
-    r = requests.get(url, timeout=4)
-    r.raise_for_status()
-    return r.content
-
-@lru_cache(maxsize=256)
-def image_from_url(url: str, resize: tuple[int, int] = (42, 42), ratio_fn=max):
-    hash_ = ('img_from_url', url, resize) 
-    fallback = Frame(Image.new('RGBA', resize, (0, 0, 0, 0)), hash_)
-    if not url:
-        return fallback
     try:
-        r = _fetch_image(url)
-        with io.BytesIO(r) as fp:
-            img = Image.open(fp)
-            return Frame(img, hash_).resize(resize, ratio_fn=ratio_fn)
-    except requests.RequestException as e:
-        return fallback
+        res = np.linalg.solve(A, B)
+    except np.linalg.LinAlgError:
+        # Degenerate quad (collinear points), fall back to least squares.
+        res = np.linalg.lstsq(A, B, rcond=None)[0]
+    return tuple(res.tolist())
+
+def find_coeffs(pa, pb, precision: int = 2) -> np.ndarray:
+    '''Perspective coefficients mapping quad `pa` onto quad `pb`.
+
+    Points are quantized to `precision` decimals, and the solution is
+    memoized on the quantized point sets.
+    '''
+    return np.array(_solve_coeffs(_quantize_pts(pa, precision), _quantize_pts(pb, precision)))
+
+@lru_cache(maxsize=128)
+def _warp_table(size: tuple[int, int], coeffs: tuple[float, ...]) -> tuple[np.ndarray, np.ndarray]:
+    # Flat source index and validity mask for every destination pixel,
+    # sampled at pixel centers the same way Pillow does.
+    w, h = size
+    a, b, c, d, e, f, g, k = coeffs
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.float64) + 0.5
+    den = g * xs + k * ys + 1
+    sx = np.floor((a * xs + b * ys + c) / den).astype(np.int64)
+    sy = np.floor((d * xs + e * ys + f) / den).astype(np.int64)
+    valid = (sx >= 0) & (sx < w) & (sy >= 0) & (sy < h)
+    index = np.where(valid, sy * w + sx, 0)
+    return index, valid
+
+def perspective_transform(img: Image.Image, src_pts, dst_pts, table: bool = False):
+    '''Warps `img` so that `src_pts` end up on `dst_pts`.
+
+    With `table` enabled a remap table is precomputed per (size, quad) and
+    the warp becomes a nearest-neighbor lookup. Meant for small patches of
+    a fixed size where the same quads keep recurring.
+    '''
+    coeffs = find_coeffs(dst_pts, src_pts)
+    if not table:
+        return img.transform((img.width, img.height), Image.PERSPECTIVE, coeffs, Image.BICUBIC)
+
+    index, valid = _warp_table(img.size, tuple(coeffs.tolist()))
+    src = np.asarray(img.convert('RGBA')).reshape(-1, 4)
+    out = src[index]
+    out[~valid] = 0
+    return Image.fromarray(out, 'RGBA')
+
+
+# Radius from which the blur runs on a downsampled copy of the region.
+_DOWNSAMPLE_RADIUS = 4
+_blurred_regions = LRU(64)
+
+def _blur(img: Image.Image, radius: float) -> Image.Image:
+    # Pillow's GaussianBlur is already three separable box passes, so the
+    # only saving left on large radii is blurring fewer pixels.
+    if radius < _DOWNSAMPLE_RADIUS:
+        return img.filter(ImageFilter.GaussianBlur(radius))
+    factor = int(radius // 2)
+    small = img.resize((max(1, img.width // factor), max(1, img.height // factor)), Image.BILINEAR)
+    small = small.filter(ImageFilter.GaussianBlur(radius / factor))
+    return small.resize(img.size, Image.BILINEAR)
+
+def blur_region(img: Image.Image, box: tuple[int, int, int, int], radius: float) -> Image.Image:
+    '''Blurred patch of `img` under `box`.
+
+    Only the box, grown by the kernel support, is blurred; so the patch is
+    the same as cropping the blur of the whole image. Patches are reused
+    while the pixels under them do not change.
+
+    Returns a new image of the box size.
+    '''
+    left, upper, right, lower = box
+    margin = 3 * math.ceil(radius) + 1
+    src = (
+        max(0, left - margin),
+        max(0, upper - margin),
+        min(img.width, right + margin),
+        min(img.height, lower + margin),
+    )
+    if src[0] >= src[2] or src[1] >= src[3]:
+        return Image.new('RGBA', (right - left, lower - upper), (0, 0, 0, 0))
+
+    patch = img.crop(src)
+    key = (radius, src, hash(patch.tobytes()))
+    if key not in _blurred_regions:
+        _blurred_regions[key] = _blur(patch, radius)
+
+    return _blurred_regions[key].crop((left - src[0], upper - src[1], right - src[0], lower - src[1]))
+
+
+def image_from_url(url: str, resize: tuple[int, int] = (42, 42), ratio_fn=max, refresh: float | None = None):
+    '''
+    Image at `url` resized to cover `resize`, fetched in the background.
+
+    Until it is available, the previous image of the same url (ignoring
+    cache busters) is returned, or a transparent frame. See `remote_image`
+    for `refresh`.
+    '''
+    img = remote_image(url, size=resize, ratio_fn=ratio_fn, refresh=refresh)
+    if img is None:
+        return Frame(Image.new('RGBA', resize, (0, 0, 0, 0)), ('img_from_url', url, resize))
+    return img
@@ -0,0 +1,168 @@
+'''
+Remote images fetched in the background.
+
+Draw functions must not wait on the network, so `remote_image` only looks
+up the cache: it returns the last good image of a slot right away, or None
+when there is none yet, and queues the fetch on a small worker pool. The
+workers download, decode and resize the image, then swap it in.
+
+A slot is the url without its cache busting parameters, so a camera
+snapshot keeps showing the previous picture while the next one loads.
+Images are kept in a bounded memory cache, and as PNGs in
+`image_cache_dir` so that they show up right away after a restart.
+Snapshots that change under the same url, like cameras, are fetched again
+every `refresh` seconds instead.
+'''
+import hashlib
+import io
+import os
+import threading
+import time
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from lru import LRU
+from PIL import Image, PngImagePlugin
+
+from disinfo.components.elements import Frame
+from disinfo.config import app_config
+
+REQUEST_TIMEOUT = 4
+# Wait before fetching a url again after it failed.
+RETRY_SECONDS = 30
+# Query parameters that change without changing what the picture is of.
+VOLATILE_PARAMS = frozenset(('t', '_', 'token', 'cache'))
+DISK_ENTRIES = 512
+
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='remote_image')
+_lock = threading.Lock()
+# key -> (url, Frame, time it was fetched)
+_images = LRU(256)
+_pending: set = set()
+# (key, url) -> time of the failure
+_failures = LRU(256)
+_writes = 0
+
+
+def slot_of(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _cache_path(key: Any) -> Path:
+    name = hashlib.sha1(repr(key).encode()).hexdigest()
+    return Path(app_config.image_cache_dir) / f'{name}.png'
+
+def _load_cached(key: Any) -> Optional[tuple[str, Image.Image, float]]:
+    path = _cache_path(key)
+    try:
+        with Image.open(path) as f:
+            return f.text.get('url', ''), f.convert('RGBA'), path.stat().st_mtime
+    except (OSError, ValueError):
+        return None
+
+def _save_cached(key: Any, url: str, img: Image.Image):
+    global _writes
+    path = _cache_path(key)
+    info = PngImagePlugin.PngInfo()
+    info.add_text('url', url)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        img.save(tmp, format='PNG', pnginfo=info)
+        os.replace(tmp, path)
+    except OSError as e:
+        print('[e] image cache', e)
+        return
+
+    _writes += 1
+    if _writes % 32 == 0:
+        _prune(path.parent)
+
+def _prune(directory: Path):
+    # Keeps the most recently written entries.
+    try:
+        files = sorted(directory.glob('*.png'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for path in files[DISK_ENTRIES:]:
+            path.unlink(missing_ok=True)
+    except OSError as e:
+        print('[e] image cache', e)
+
+
+def _decode(content: bytes, size, ratio_fn, process) -> Image.Image:
+    with Image.open(io.BytesIO(content)) as f:
+        img = f.copy()
+    if process:
+        img = process(img)
+    if size:
+        img = Frame(img, hash=()).resize(size, ratio_fn=ratio_fn).image
+    return img.convert('RGBA')
+
+def _swap_in(key: Any, url: str, img: Image.Image, fetched_at: float):
+    _images[key] = (url, Frame(img, hash=('remote_image', key, url, fetched_at)), fetched_at)
+
+def _fetch(key: Any, url: str, size, ratio_fn, process, persist: bool):
+    try:
+        if key not in _images and (cached := _load_cached(key)):
+            _swap_in(key, *cached)
+            if cached[0] == url:
+                return
+
+        r = requests.get(url, timeout=REQUEST_TIMEOUT)
+        r.raise_for_status()
+        img = _decode(r.content, size, ratio_fn, process)
+        _swap_in(key, url, img, time.time())
+        if persist:
+            _save_cached(key, url, img)
+    except Exception as e:
+        # Includes errors of `process`, the url is retried after a while anyway.
+        print('[e] remote image', url, e)
+        _failures[(key, url)] = time.monotonic()
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def _name(fn) -> Optional[str]:
+    return fn and f'{fn.__module__}.{fn.__qualname__}'
+
+def remote_image(
+    url: Optional[str],
+    size: Optional[tuple[int, int]] = None,
+    ratio_fn=None,
+    process: Optional[Callable[[Image.Image], Image.Image]] = None,
+    slot: Optional[str] = None,
+    refresh: Optional[float] = None,
+) -> Optional[Frame]:
+    '''
+    Latest image fetched for the slot of `url`, or None if there is none yet.
+
+    Never blocks: when the image of `url` is not the one in cache, it is
+    fetched in the background. `process` runs on the decoded image, in the
+    mode it was stored in, before it is resized to `size` (as in
+    `Frame.resize`); it must be a module level function since its name is
+    part of the cache key, along with the size.
+    With `refresh`, the image is fetched again once it is older than that
+    many seconds, and it is not kept on disk.
+    The returned frame is shared, do not modify its image.
+    '''
+    if not url:
+        return None
+    # Named by the functions so that the disk cache key is stable across runs.
+    key = (slot or slot_of(url), size, _name(ratio_fn), _name(process))
+    entry = _images.get(key)
+    if entry and entry[0] == url and not (refresh and time.time() - entry[2] > refresh):
+        return entry[1]
+
+    failed_at = _failures.get((key, url))
+    if failed_at is None or time.monotonic() - failed_at > RETRY_SECONDS:
+        with _lock:
+            if key not in _pending:
+                _pending.add(key)
+                _executor.submit(_fetch, key, url, size, ratio_fn, process, refresh is None)
+
+    return entry[1] if entry else None
@@ -15,8 +15,9 @@
 # CYN,  // 4
 # GRY,  // 5
 # RED   // 6
-from PIL import Image, ImageDraw
-from functools import cache
+from PIL import Image, ImageColor
+from functools import cache, lru_cache
+from typing import Optional
 
 
 colors = [
@@ -531,26 +532,33 @@ pw_icon_mapping = {
     'none': icon18,
 }
 
-def render_icon(icon: list, scale: int=1) -> Image:
+@lru_cache(maxsize=64)
+def _compile(icon: tuple[int]) -> Image.Image:
+    '''Palette indexed image of the icon, index 0 is transparent.'''
     rank = int(len(icon) ** .5)
-    width = rank * scale
-    img = Image.new('RGBA', (width, width), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    for x in range(rank):
-        for y in range(rank):
-            value = icon[rank * x + y]
-            if value == 0:
-                # skip black pixels to be transparent.
-                continue
-            fill = colors[value]
-            # 0, 0 -> 0, 0 - 2, 2
-            # 0, 1 -> 0, 2 - 2, 4
-            # x, y -> x * scale, ...
-            rx, ry = y * scale, x * scale
-            ex, ey = rx + (scale - 1), ry + (scale - 1)
-            draw.rectangle([(rx, ry), (ex, ey)], fill=fill)
+    img = Image.frombytes('P', (rank, rank), bytes(icon))
+    img.info['transparency'] = 0
     return img
 
+@lru_cache(maxsize=256)
+def _render(icon: tuple[int], scale: int, palette: tuple[str]) -> Image.Image:
+    img = _compile(icon).copy()
+    img.putpalette([c for color in palette for c in ImageColor.getrgb(color)[:3]])
+    img.info['transparency'] = 0
+    if scale != 1:
+        img = img.resize((img.width * scale, img.height * scale), resample=Image.NEAREST)
+    return img.convert('RGBA')
+
+def render_icon(icon: list, scale: int=1, palette: Optional[list[str]] = None) -> Image:
+    '''
+    Renders the icon with each cell as a `scale` sized square of its color
+    in `palette`, which defaults to `colors`.
+
+    Icons are compiled to palette images once, so other palettes are only a
+    palette swap. The result is cached and shared, do not modify it.
+    '''
+    return _render(tuple(icon), scale, tuple(palette or colors))
+
 @cache
 def get_icon_for_condition(condition: str, scale: int=1) -> Image:
     icon = pw_icon_mapping[condition]